@@ -17,6 +17,7 @@ from collections import defaultdict
 from typing import cast
 from typing import Collection
 from typing import Dict
+from typing import FrozenSet
 from typing import List
 from typing import Mapping
 from typing import MutableMapping
@@ -27,6 +28,7 @@ from typing import Type
 
 import arrow
 import colorlog
+import numpy as np
 import staticconf
 from kubernetes.client.models.v1_pod import V1Pod as KubernetesPod
 
@@ -81,6 +83,7 @@ class PoolManager:
             self.pool_config.read_int("scaling_limits.min_node_scalein_uptime_seconds", default=-1),
             MAX_MIN_NODE_SCALEIN_UPTIME_SECONDS,
         )
+        self._node_metadatas_cache: Dict[Optional[FrozenSet[str]], Sequence[ClusterNodeMetadata]] = {}
 
         if fetch_state:
             self.reload_state()
@@ -90,6 +93,7 @@ class PoolManager:
         ``Autoscaler.run()``.
         """
         logger.info("Reloading cluster connector state")
+        self.invalidate_node_metadatas()
         self.cluster_connector.reload_state(**cluster_connector_kwargs)
 
         logger.info("Reloading resource groups")
@@ -193,18 +197,25 @@ class PoolManager:
 
         if not dry_run:
             if self.draining_enabled:
-                for node_metadatas in marked_nodes_by_group.values():
-                    for node_metadata in node_metadatas:
-                        self.submit_for_draining(node_metadata, TerminationReason.SCALING_DOWN)
+                try:
+                    for node_metadatas in marked_nodes_by_group.values():
+                        for node_metadata in node_metadatas:
+                            self.submit_for_draining(node_metadata, TerminationReason.SCALING_DOWN)
+                finally:
+                    self.flush_draining_submissions()
             else:
                 for group_id, node_metadatas in marked_nodes_by_group.items():
                     self.resource_groups[group_id].terminate_instances_by_id(
                         [node_metadata.instance.instance_id for node_metadata in node_metadatas]
                     )
+                self.invalidate_node_metadatas()
 
     def submit_for_draining(self, node_metadata: ClusterNodeMetadata, termination_reason: TerminationReason) -> None:
         """Submit collection of nodes for draining
 
+        Submissions are buffered by the draining client: callers must call ``flush_draining_submissions``
+        once done submitting (also when a submission fails), otherwise buffered nodes may never be drained.
+
         :param ClusterNodeMetadata node_metadata: node to be drained
         :param TerminationReason termination_reason: reason for draining
         """
@@ -223,20 +234,46 @@ class PoolManager:
             termination_reason=termination_reason,
         )
 
+    def flush_draining_submissions(self) -> None:
+        """Send out draining submissions still buffered by the draining client
+
+        :raises DrainingSubmissionError: if any submission could not be sent
+        """
+        if self.draining_client:
+            self.draining_client.flush()
+
     def get_node_metadatas(self, state_filter: Optional[Collection[str]] = None) -> Sequence[ClusterNodeMetadata]:
         """Get a list of metadata about the nodes currently in the pool
 
+        Results are cached until the next state reload (or explicit invalidation).
+
         :param state_filter: only return nodes matching a particular state ('running', 'cancelled', etc)
         :returns: a list of InstanceMetadata objects
         """
-        return [
-            ClusterNodeMetadata(
-                self.cluster_connector.get_agent_metadata(instance_metadata.ip_address),
-                instance_metadata,
-            )
-            for group in self.resource_groups.values()
-            for instance_metadata in group.get_instance_metadatas(state_filter)
-        ]
+        cache_key = frozenset(state_filter) if state_filter is not None else None
+        if cache_key not in self._node_metadatas_cache:
+            self._node_metadatas_cache[cache_key] = [
+                ClusterNodeMetadata(
+                    self.cluster_connector.get_agent_metadata(instance_metadata.ip_address),
+                    instance_metadata,
+                )
+                for group in self.resource_groups.values()
+                for instance_metadata in group.get_instance_metadatas(state_filter)
+            ]
+        return self._node_metadatas_cache[cache_key]
+
+    def invalidate_node_metadatas(self) -> None:
+        """Drop cached node metadata, forcing the next lookup to query the resource groups again"""
+        self._node_metadatas_cache = {}
+
+    def get_node_weights_ndarray(self, state_filter: Optional[Collection[str]] = None) -> np.ndarray:
+        """Get the weights of the nodes currently in the pool
+
+        :param state_filter: only consider nodes matching a particular state ('running', 'cancelled', etc)
+        :returns: a float array of node weights
+        """
+        nodes = self.get_node_metadatas(state_filter)
+        return np.fromiter((node.instance.weight for node in nodes), dtype=np.float64, count=len(nodes))
 
     def terminate_expired_orphan_instances(self, threshold_seconds: int, dry_run: bool = False) -> None:
         if dry_run:
@@ -252,6 +289,7 @@ class PoolManager:
 
         for group_id, instance_ids in group_id_to_instance_ids.items():
             self.resource_groups[group_id].terminate_instances_by_id(instance_ids)
+        self.invalidate_node_metadatas()
 
     def get_expired_orphan_instances(self, threshold_seconds: int) -> Dict[str, List[str]]:
         known_group_ids = {group.id for group in self.resource_groups.values()}
@@ -14,6 +14,7 @@
 from typing import List
 from typing import Mapping
 from typing import NamedTuple
+from typing import Optional
 from typing import Sequence
 
 import arrow
@@ -21,6 +22,7 @@ import boto3
 import botocore.exceptions
 import colorlog
 import staticconf
+from botocore.config import Config
 from cachetools.func import ttl_cache
 from mypy_extensions import TypedDict
 from retry import retry
@@ -30,6 +32,8 @@ from clusterman.config import CREDENTIALS_NAMESPACE
 logger = colorlog.getLogger(__name__)
 _session = None
 MAX_PAGE_SIZE = 500
+# draining queues are processed by concurrent workers, which would wait on the default 10-connection pool
+SQS_MAX_POOL_CONNECTIONS = 50
 
 FleetInstanceDict = TypedDict(
     "FleetInstanceDict",
@@ -78,8 +82,13 @@ def _init_session():
         )
 
 
+def _sqs_config() -> Config:
+    return Config(max_pool_connections=SQS_MAX_POOL_CONNECTIONS)
+
+
 class _BotoForwarder(type):
     _client = None
+    client_config: Optional[Config] = None
 
     def __new__(cls, name, parents, dct):
         global _session
@@ -99,6 +108,7 @@ class _BotoForwarder(type):
             cls._client = _session.client(
                 cls.client,
                 endpoint_url=endpoint_url,
+                config=cls.client_config,
             )
         return getattr(cls._client, key)
 
@@ -113,6 +123,7 @@ class ec2(metaclass=_BotoForwarder):
 
 class sqs(metaclass=_BotoForwarder):
     client = "sqs"
+    client_config = _sqs_config()
 
 
 class sts(metaclass=_BotoForwarder):
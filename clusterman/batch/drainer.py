@@ -28,6 +28,7 @@ from clusterman.config import get_pool_config_path
 from clusterman.config import load_cluster_pool_config
 from clusterman.config import setup_config
 from clusterman.draining.mesos import operator_api
+from clusterman.draining.queue import DEFAULT_QUEUE_WORKERS
 from clusterman.draining.queue import DrainingClient
 from clusterman.kubernetes.kubernetes_cluster_connector import KubernetesClusterConnector
 from clusterman.util import get_pool_name_list
@@ -39,6 +40,9 @@ class NodeDrainerBatch(BatchDaemon, BatchLoggingMixin, BatchRunningSentinelMixin
 
     CLI_SUBCOMMAND = "drain"
     DEFAULT_RUN_INTERVAL_SECONDS = 5
+    # queues are polled one after the other, so long-polling must stay short not to delay spot interruption
+    # warnings (which give 2 minutes notice) behind the drain and termination queues
+    DEFAULT_RECEIVE_WAIT_SECONDS = 1
 
     @batch_command_line_arguments
     def parse_args(self, parser: argparse.ArgumentParser):
@@ -52,6 +56,9 @@ class NodeDrainerBatch(BatchDaemon, BatchLoggingMixin, BatchRunningSentinelMixin
         self.run_interval = staticconf.read_int(
             "batches.drainer.run_interval_seconds", self.DEFAULT_RUN_INTERVAL_SECONDS
         )
+        self.receive_wait_seconds = staticconf.read_int(
+            "batches.drainer.receive_wait_seconds", self.DEFAULT_RECEIVE_WAIT_SECONDS
+        )
         for scheduler in ("mesos", "kubernetes"):
             for pool in get_pool_name_list(self.options.cluster, scheduler):
                 load_cluster_pool_config(self.options.cluster, pool, scheduler, None)
@@ -60,11 +67,12 @@ class NodeDrainerBatch(BatchDaemon, BatchLoggingMixin, BatchRunningSentinelMixin
 
     def run(self):
         cluster_name = self.options.cluster
-        draining_client = DrainingClient(cluster_name)
+        draining_client = DrainingClient(cluster_name, receive_wait_seconds=self.receive_wait_seconds)
         cluster_manager_name = staticconf.read_string(f"clusters.{cluster_name}.cluster_manager")
         always_delay_drain_processing = staticconf.read_bool(
             f"clusters.{cluster_name}.always_delay_drain_processing", True
         )
+        queue_workers = staticconf.read_int("batches.drainer.queue_workers", DEFAULT_QUEUE_WORKERS)
         mesos_operator_client = kube_operator_client = None
 
         try:
@@ -79,21 +87,26 @@ class NodeDrainerBatch(BatchDaemon, BatchLoggingMixin, BatchRunningSentinelMixin
             except Exception:
                 self.logger.error("Cluster specified is kubernetes specific. Skipping mesos operator")
 
-        self.logger.info("Polling SQS for messages every 5s")
+        self.logger.info(
+            f"Polling SQS for messages every {self.run_interval}s, "
+            f"waiting up to {self.receive_wait_seconds}s for drain and termination messages"
+        )
         while self.running:
             if kube_operator_client:
                 kube_operator_client.reload_client()
             draining_client.clean_processing_hosts_cache()
             warning_result = draining_client.process_warning_queue()
-            draining_result = draining_client.process_drain_queue(
+            draining_result = draining_client.process_drain_queue_concurrently(
                 mesos_operator_client=mesos_operator_client,
                 kube_operator_client=kube_operator_client,
+                num_workers=queue_workers,
             )
-            termination_result = draining_client.process_termination_queue(
+            termination_result = draining_client.process_termination_queue_concurrently(
                 mesos_operator_client=mesos_operator_client,
                 kube_operator_client=kube_operator_client,
+                num_workers=queue_workers,
             )
-            # sleep five seconds only if all queues are empty OR feature flag is enabled
+            # sleep run_interval only if all queues are empty OR feature flag is enabled
             if always_delay_drain_processing or (not warning_result and not draining_result and not termination_result):
                 time.sleep(self.run_interval)
 
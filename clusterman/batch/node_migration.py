@@ -15,6 +15,7 @@ import argparse
 import logging
 import time
 from collections import defaultdict
+from multiprocessing import Event
 from multiprocessing import Lock
 from typing import Callable
 from typing import Collection
@@ -165,7 +166,8 @@ class NodeMigration(BatchDaemon, BatchLoggingMixin, BatchRunningSentinelMixin):
             return False
         lock_key = label.split(self.WORKER_LABEL_SEPARATOR, 1)[1]
         kwargs["pool_lock"] = self.worker_locks[lock_key]
-        proc = RestartableDaemonProcess(target=routine, args=args, kwargs=kwargs)
+        kwargs["stop_event"] = Event()
+        proc = RestartableDaemonProcess(target=routine, args=args, kwargs=kwargs, stop_event=kwargs["stop_event"])
         self.migration_workers[label] = proc
         proc.start()
         return True
@@ -14,14 +14,28 @@
 import enum
 import json
 import socket
+import time
+from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from threading import local
+from threading import Lock
+from typing import Any
 from typing import Callable
+from typing import DefaultDict
+from typing import Deque
 from typing import Dict
 from typing import Hashable
+from typing import Iterator
+from typing import List
 from typing import MutableMapping
 from typing import NamedTuple
 from typing import Optional
 from typing import Sequence
 from typing import Set
+from typing import Tuple
 from typing import Type
 
 import arrow
@@ -43,10 +57,16 @@ from clusterman.draining.kubernetes import uncordon as k8s_uncordon
 from clusterman.draining.mesos import down
 from clusterman.draining.mesos import drain as mesos_drain
 from clusterman.draining.mesos import up
+from clusterman.exceptions import DrainingSubmissionError
 from clusterman.interfaces.types import InstanceMetadata
 from clusterman.kubernetes.kubernetes_cluster_connector import KubernetesClusterConnector
 from clusterman.util import get_pool_name_list
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 
 logger = colorlog.getLogger(__name__)
 DRAIN_CACHE_SECONDS = 1800
@@ -54,11 +74,19 @@ DEFAULT_RESOURCE_GROUPS_CACHE_SECONDS = 0
 DEFAULT_FORCE_TERMINATION = False
 DEFAULT_GLOBAL_REDRAINING_DELAY_SECONDS = 15
 DEFAULT_DRAINING_TIME_THRESHOLD_SECONDS = 1800
+SQS_MAX_BATCH_SIZE = 10
+DEFAULT_RECEIVE_WAIT_SECONDS = 20
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = 30  # SQS default
+DEFAULT_QUEUE_WORKERS = 4
+MAX_TERMINATION_THREADS = 10
+INSTANCE_DETAILS_CACHE_SIZE = 1024
+INSTANCE_DETAILS_CACHE_SECONDS = 300
 EC2_ASG_TAG_KEY = "aws:autoscaling:groupName"
 EC2_TAG_GROUP_KEYS = {
     "aws:ec2spot:fleet-request-id",
     "aws:autoscaling:groupName",
 }
+SqsMessage = Dict[str, Any]
 
 
 class TerminationReason(enum.Enum):
@@ -67,6 +95,12 @@ class TerminationReason(enum.Enum):
     NODE_MIGRATION = "node migration"
 
 
+# plain string values, to skip enum attribute lookups when building or inspecting messages
+REASON_SCALING_DOWN = TerminationReason.SCALING_DOWN.value
+REASON_SPOT_INTERRUPTION = TerminationReason.SPOT_INTERRUPTION.value
+REASON_NODE_MIGRATION = TerminationReason.NODE_MIGRATION.value
+
+
 class Host(NamedTuple):
     instance_id: str
     hostname: str
@@ -77,22 +111,35 @@ class Host(NamedTuple):
     agent_id: str = ""
     pool: str = ""
     attempt: int = 1
-    termination_reason: str = TerminationReason.SCALING_DOWN.value
+    termination_reason: str = REASON_SCALING_DOWN
     draining_start_time: str = arrow.now().for_json()
     scheduler: str = "mesos"
 
 
 class DrainingClient:
-    def __init__(self, cluster_name: str) -> None:
+    def __init__(self, cluster_name: str, receive_wait_seconds: int = DEFAULT_RECEIVE_WAIT_SECONDS) -> None:
         self.client = sqs
         self.cluster = cluster_name
+        self.receive_wait_seconds = receive_wait_seconds
+        self.visibility_timeout_seconds = staticconf.read_int(
+            f"clusters.{cluster_name}.queue_visibility_timeout_seconds",
+            default=DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+        )
         self.global_redraining_delay_seconds = staticconf.read_int(
             "global_redraining_delay_seconds",
             default=DEFAULT_GLOBAL_REDRAINING_DELAY_SECONDS,
         )
         self.drain_queue_url = staticconf.read_string(f"clusters.{cluster_name}.drain_queue_url")
         self.termination_queue_url = staticconf.read_string(f"clusters.{cluster_name}.termination_queue_url")
-        self.draining_host_ttl_cache: Dict[str, arrow.Arrow] = {}
+        # expiration times, as time.monotonic() values
+        self.draining_host_ttl_cache: Dict[str, float] = {}
+        # received messages not consumed yet, along with their time.monotonic() receive time
+        self._drain_messages_buffer: Deque[Tuple[float, SqsMessage]] = deque()
+        self._termination_messages_buffer: Deque[Tuple[float, SqsMessage]] = deque()
+        self._send_buffers: DefaultDict[str, List[SqsMessage]] = defaultdict(list)
+        self._send_buffers_lock = Lock()
+        # messages submitted while a queue worker is processing its own batch, see _collect_submissions
+        self._thread_submissions = local()
         self.warning_queue_url = staticconf.read_string(
             f"clusters.{cluster_name}.warning_queue_url",
             default=None,
@@ -122,15 +169,10 @@ class DrainingClient:
         termination_reason: TerminationReason,
         draining_start_time: arrow.Arrow,
     ) -> None:
-        return self.client.send_message(
-            QueueUrl=self.drain_queue_url,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": RESOURCE_GROUPS_REV[sender],
-                },
-            },
-            MessageBody=json.dumps(
+        self._enqueue_message(
+            self.drain_queue_url,
+            sender=RESOURCE_GROUPS_REV[sender],
+            message_body=_dumps(
                 {
                     "agent_id": agent_id,
                     "attempt": 1,
@@ -140,23 +182,17 @@ class DrainingClient:
                     "instance_id": instance.instance_id,
                     "ip": instance.ip_address,
                     "pool": pool,
-                    "termination_reason": termination_reason.value,
                     "scheduler": scheduler,
+                    "termination_reason": termination_reason.value,
                 }
             ),
         )
 
     def submit_host_for_draining(self, host: Host, delay: Optional[int] = 0, attempt: Optional[int] = 1) -> None:
-        return self.client.send_message(
-            QueueUrl=self.drain_queue_url,
-            DelaySeconds=delay,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": host.sender,
-                },
-            },
-            MessageBody=json.dumps(
+        self._enqueue_message(
+            self.drain_queue_url,
+            sender=host.sender,
+            message_body=_dumps(
                 {
                     "agent_id": host.agent_id,
                     "attempt": attempt,
@@ -170,6 +206,7 @@ class DrainingClient:
                     "termination_reason": host.termination_reason,
                 }
             ),
+            delay=delay,
         )
 
     def submit_host_for_termination(self, host: Host, delay: Optional[int] = None) -> None:
@@ -179,16 +216,10 @@ class DrainingClient:
             else staticconf.read_int(f"drain_termination_timeout_seconds.{host.sender}", default=90)
         )
         logger.info(f"Delaying terminating {host.instance_id} for {delay_seconds} seconds")
-        return self.client.send_message(
-            QueueUrl=self.termination_queue_url,
-            DelaySeconds=delay_seconds,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": host.sender,
-                },
-            },
-            MessageBody=json.dumps(
+        self._enqueue_message(
+            self.termination_queue_url,
+            sender=host.sender,
+            message_body=_dumps(
                 {
                     "agent_id": host.agent_id,
                     "draining_start_time": host.draining_start_time,
@@ -201,19 +232,128 @@ class DrainingClient:
                     "termination_reason": host.termination_reason,
                 }
             ),
+            delay=delay_seconds,
         )
 
-    def get_host_to_drain(self) -> Optional[Host]:
-        messages = self.client.receive_message(
-            QueueUrl=self.drain_queue_url,
-            MessageAttributeNames=["Sender"],
-            MaxNumberOfMessages=1,
-        ).get("Messages", [])
-        if messages:
-            host_data = json.loads(messages[0]["Body"])
+    def _enqueue_message(
+        self,
+        queue_url: str,
+        sender: str,
+        message_body: str,
+        delay: Optional[int] = None,
+    ) -> None:
+        """Buffer message for sending; the buffer is sent as soon as it fills a batch, or when flushed
+
+        :param str queue_url: queue the message is meant for
+        :param str sender: value for the Sender message attribute
+        :param str message_body: serialized message
+        :param Optional[int] delay: message delivery delay in seconds
+        """
+        entry: SqsMessage = {
+            "MessageAttributes": _sender_message_attributes(sender),
+            "MessageBody": message_body,
+        }
+        if delay is not None:
+            entry["DelaySeconds"] = delay
+        collected_submissions = getattr(self._thread_submissions, "entries", None)
+        if collected_submissions is not None:
+            collected_submissions.append((queue_url, entry))
+            return
+        with self._send_buffers_lock:
+            buffer = self._send_buffers[queue_url]
+            buffer.append(entry)
+            if len(buffer) < SQS_MAX_BATCH_SIZE:
+                return
+            self._send_buffers[queue_url] = []
+        if self._send_messages(queue_url, buffer):
+            raise DrainingSubmissionError(f"Failed to send some messages to {queue_url}")
+
+    def flush(self) -> None:
+        """Send all buffered messages
+
+        :raises DrainingSubmissionError: if any message could not be sent
+        """
+        with self._send_buffers_lock:
+            send_buffers = self._send_buffers
+            self._send_buffers = defaultdict(list)
+        failed_queue_urls = [
+            queue_url for queue_url, entries in send_buffers.items() if self._send_messages(queue_url, entries)
+        ]
+        if failed_queue_urls:
+            raise DrainingSubmissionError(f"Failed to send some messages to {', '.join(failed_queue_urls)}")
+
+    @contextmanager
+    def _collect_submissions(self) -> Iterator[List[Tuple[str, SqsMessage]]]:
+        """Keep messages submitted by the current thread out of the shared send buffers
+
+        The caller is in charge of sending the collected (queue url, message) pairs, so it can tell
+        which of its own submissions failed before deleting the messages that caused them.
+        """
+        submissions: List[Tuple[str, SqsMessage]] = []
+        self._thread_submissions.entries = submissions
+        try:
+            yield submissions
+        finally:
+            self._thread_submissions.entries = None
+
+    def _send_submissions(self, submissions: Sequence[Tuple[str, SqsMessage]]) -> Set[int]:
+        """Send collected submissions, in batches per queue
+
+        :param submissions: (queue url, message) pairs
+        :return: indexes of the submissions which could not be sent
+        """
+        indexes_by_queue_url: DefaultDict[str, List[int]] = defaultdict(list)
+        for index, (queue_url, _) in enumerate(submissions):
+            indexes_by_queue_url[queue_url].append(index)
+        failed_indexes: Set[int] = set()
+        for queue_url, indexes in indexes_by_queue_url.items():
+            try:
+                failed_entries: Sequence[int] = self._send_messages(
+                    queue_url, [submissions[index][1] for index in indexes]
+                )
+            except ClientError as e:
+                logger.error(f"Failed to send messages to {queue_url}: {e}")
+                failed_entries = range(len(indexes))
+            failed_indexes.update(indexes[entry_index] for entry_index in failed_entries)
+        return failed_indexes
+
+    def _send_messages(self, queue_url: str, entries: Sequence[SqsMessage]) -> List[int]:
+        """Send messages to queue, in batches
+
+        :param str queue_url: queue to send messages to
+        :param Sequence[SqsMessage] entries: messages to send
+        :return: indexes of the entries which could not be sent
+        """
+        failed_entries = []
+        for i in range(0, len(entries), SQS_MAX_BATCH_SIZE):
+            response = self.client.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(entry_id), **entry}
+                    for entry_id, entry in enumerate(entries[i : i + SQS_MAX_BATCH_SIZE], start=i)
+                ],
+            )
+            for failure in response.get("Failed", []):
+                logger.error(f"Failed to send message to {queue_url}: {failure}")
+                failed_entries.append(int(failure["Id"]))
+        return failed_entries
+
+    def get_host_to_drain(self, buffered_only: bool = False, max_messages: int = 1) -> Optional[Host]:
+        """Get next host to drain
+
+        :param bool buffered_only: only look at messages already received, without calling SQS
+        :param int max_messages: number of messages to receive from SQS when none are buffered
+            (should not exceed the number of hosts the caller is going to handle right away)
+        :return: host to drain, if any available
+        """
+        message = self._receive_buffered_message(
+            self.drain_queue_url, self._drain_messages_buffer, buffered_only, max_messages
+        )
+        if message:
+            host_data = _loads(message["Body"])
             return Host(
-                sender=messages[0]["MessageAttributes"]["Sender"]["StringValue"],
-                receipt_handle=messages[0]["ReceiptHandle"],
+                sender=message["MessageAttributes"]["Sender"]["StringValue"],
+                receipt_handle=message["ReceiptHandle"],
                 **host_data,
             )
         return None
@@ -227,7 +367,7 @@ class DrainingClient:
             MaxNumberOfMessages=1,
         ).get("Messages", [])
         if messages:
-            event_data = json.loads(messages[0]["Body"])
+            event_data = _loads(messages[0]["Body"])
             host = host_from_instance_id(
                 receipt_handle=messages[0]["ReceiptHandle"],
                 instance_id=event_data["detail"]["instance-id"],
@@ -247,180 +387,331 @@ class DrainingClient:
                 return host
         return None
 
-    def get_host_to_terminate(self) -> Optional[Host]:
-        messages = self.client.receive_message(
-            QueueUrl=self.termination_queue_url,
-            MessageAttributeNames=["Sender"],
-            MaxNumberOfMessages=1,
-        ).get("Messages", [])
-        if messages:
-            host_data = json.loads(messages[0]["Body"])
+    def get_host_to_terminate(self, buffered_only: bool = False, max_messages: int = 1) -> Optional[Host]:
+        """Get next host to terminate
+
+        :param bool buffered_only: only look at messages already received, without calling SQS
+        :param int max_messages: number of messages to receive from SQS when none are buffered
+            (should not exceed the number of hosts the caller is going to handle right away)
+        :return: host to terminate, if any available
+        """
+        message = self._receive_buffered_message(
+            self.termination_queue_url, self._termination_messages_buffer, buffered_only, max_messages
+        )
+        if message:
+            host_data = _loads(message["Body"])
             return Host(
-                sender=messages[0]["MessageAttributes"]["Sender"]["StringValue"],
-                receipt_handle=messages[0]["ReceiptHandle"],
+                sender=message["MessageAttributes"]["Sender"]["StringValue"],
+                receipt_handle=message["ReceiptHandle"],
                 **host_data,
             )
         return None
 
+    def _receive_buffered_message(
+        self,
+        queue_url: str,
+        buffer: Deque[Tuple[float, SqsMessage]],
+        buffered_only: bool = False,
+        max_messages: int = 1,
+    ) -> Optional[SqsMessage]:
+        """Get next message from queue, fetching them in batches and buffering the ones not consumed yet
+
+        :param str queue_url: queue to receive messages from
+        :param Deque[Tuple[float, SqsMessage]] buffer: messages already received from the queue, with receive times
+        :param bool buffered_only: do not receive new messages if the buffer is empty
+        :param int max_messages: number of messages to receive from SQS, at most SQS_MAX_BATCH_SIZE
+        :return: message, if any available
+        """
+        # deque operations are atomic, so the buffer can be shared by concurrent queue workers
+        while True:
+            try:
+                receive_time, message = buffer.popleft()
+            except IndexError:
+                break
+            # past the visibility timeout SQS hands the message out again, so the buffered copy is dropped; only
+            # messages with at least half their visibility timeout left are handed out, see process_drain_queue
+            if time.monotonic() - receive_time < self.visibility_timeout_seconds / 2:
+                return message
+            logger.warning(f"Dropping message buffered past the visibility timeout: {message['ReceiptHandle']}")
+        if buffered_only:
+            return None
+        messages = self.client.receive_message(
+            QueueUrl=queue_url,
+            MessageAttributeNames=["Sender"],
+            MaxNumberOfMessages=min(max_messages, SQS_MAX_BATCH_SIZE),
+            WaitTimeSeconds=self.receive_wait_seconds,
+        ).get("Messages", [])
+        if not messages:
+            return None
+        receive_time = time.monotonic()
+        buffer.extend((receive_time, message) for message in messages[1:])
+        return messages[0]
+
     def delete_drain_messages(self, hosts: Sequence[Host]) -> None:
-        for host in hosts:
-            self.client.delete_message(
-                QueueUrl=self.drain_queue_url,
-                ReceiptHandle=host.receipt_handle,
-            )
+        self._delete_messages(self.drain_queue_url, hosts)
+
+    def extend_drain_messages_visibility(self, hosts: Sequence[Host]) -> None:
+        self._extend_messages_visibility(self.drain_queue_url, hosts)
 
     def delete_terminate_messages(self, hosts: Sequence[Host]) -> None:
-        for host in hosts:
-            self.client.delete_message(
-                QueueUrl=self.termination_queue_url,
-                ReceiptHandle=host.receipt_handle,
-            )
+        self._delete_messages(self.termination_queue_url, hosts)
 
     def delete_warning_messages(self, hosts: Sequence[Host]) -> None:
         if self.warning_queue_url is None:
             return
-        for host in hosts:
-            self.client.delete_message(
-                QueueUrl=self.warning_queue_url,
-                ReceiptHandle=host.receipt_handle,
+        self._delete_messages(self.warning_queue_url, hosts)
+
+    def _delete_messages(self, queue_url: str, hosts: Sequence[Host]) -> None:
+        for i in range(0, len(hosts), SQS_MAX_BATCH_SIZE):
+            response = self.client.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(entry_id), "ReceiptHandle": host.receipt_handle}
+                    for entry_id, host in enumerate(hosts[i : i + SQS_MAX_BATCH_SIZE])
+                ],
             )
+            for failure in response.get("Failed", []):
+                logger.error(f"Failed to delete message from {queue_url}: {failure}")
+
+    def _extend_messages_visibility(self, queue_url: str, hosts: Sequence[Host]) -> None:
+        """Restart the visibility timeout of received messages, so SQS doesn't hand them out again meanwhile"""
+        for i in range(0, len(hosts), SQS_MAX_BATCH_SIZE):
+            response = self.client.change_message_visibility_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {
+                        "Id": str(entry_id),
+                        "ReceiptHandle": host.receipt_handle,
+                        "VisibilityTimeout": self.visibility_timeout_seconds,
+                    }
+                    for entry_id, host in enumerate(hosts[i : i + SQS_MAX_BATCH_SIZE])
+                ],
+            )
+            for failure in response.get("Failed", []):
+                logger.error(f"Failed to extend message visibility in {queue_url}: {failure}")
 
     def process_termination_queue(
         self,
         mesos_operator_client: Optional[Callable[..., Callable[[str], Callable[..., None]]]],
         kube_operator_client: Optional[KubernetesClusterConnector],
+        batch_size: int = SQS_MAX_BATCH_SIZE,
     ) -> bool:
-        message_exist = False
-        host_to_terminate = self.get_host_to_terminate()
-        if host_to_terminate:
-            message_exist = True
+        hosts_to_terminate = []
+        host_to_terminate = self.get_host_to_terminate(max_messages=batch_size)
+        while host_to_terminate:
+            hosts_to_terminate.append(host_to_terminate)
+            if len(hosts_to_terminate) >= batch_size:
+                break
+            host_to_terminate = self.get_host_to_terminate(buffered_only=True)
+        if not hosts_to_terminate:
+            return False
+
+        hosts_by_scheduler: DefaultDict[str, List[Host]] = defaultdict(list)
+        for host in hosts_to_terminate:
+            hosts_by_scheduler[host.scheduler].append(host)
+        terminated_hosts = []
+        for scheduler, hosts in hosts_by_scheduler.items():
             # as for draining if it has a hostname we should down + up around the termination
-            if host_to_terminate.scheduler == "mesos":
-                logger.info(f"Mesos hosts to down+terminate+up: {host_to_terminate}")
-                hostname_ip = f"{host_to_terminate.hostname}|{host_to_terminate.ip}"
-                try:
-                    down(mesos_operator_client, [hostname_ip])
-                except Exception as e:
-                    logger.error(f"Failed to down {hostname_ip} continuing to terminate anyway: {e}")
-                terminate_host(host_to_terminate)
+            if scheduler == "mesos":
+                logger.info(f"Mesos hosts to down+terminate+up: {hosts}")
+                hostname_ips = [_hostname_ip(host) for host in hosts]
                 try:
-                    up(mesos_operator_client, [hostname_ip])
+                    down(mesos_operator_client, hostname_ips)
                 except Exception as e:
-                    logger.error(f"Failed to up {hostname_ip} continuing to terminate anyway: {e}")
-            elif host_to_terminate.scheduler == "kubernetes":
-                logger.info(f"Kubernetes hosts to delete k8s node and terminate: {host_to_terminate}")
+                    logger.error(f"Failed to down {hostname_ips} continuing to terminate anyway: {e}")
+                terminated_hosts.extend(_terminate_hosts(hosts))
                 try:
-                    terminate_host(host_to_terminate)
+                    up(mesos_operator_client, hostname_ips)
                 except Exception as e:
-                    logger.exception(f"Failed to terminate {host_to_terminate.instance_id}: {e}")
-                    # we should stop here so as not to delete message from queue
-                    return message_exist
+                    logger.error(f"Failed to up {hostname_ips} continuing to terminate anyway: {e}")
+            elif scheduler == "kubernetes":
+                logger.info(f"Kubernetes hosts to delete k8s node and terminate: {hosts}")
+                terminated_hosts.extend(_terminate_hosts(hosts))
             else:
-                logger.info(f"Host to terminate immediately: {host_to_terminate}")
-                terminate_host(host_to_terminate)
-            self.delete_terminate_messages([host_to_terminate])
-        return message_exist
+                logger.info(f"Hosts to terminate immediately: {hosts}")
+                terminated_hosts.extend(_terminate_hosts(hosts))
+        # messages for hosts which failed termination are not deleted, so they get retried
+        if terminated_hosts:
+            self.delete_terminate_messages(terminated_hosts)
+        return True
 
     def process_drain_queue(
         self,
         mesos_operator_client: Optional[Callable[..., Callable[[str], Callable[..., None]]]],
         kube_operator_client: Optional[KubernetesClusterConnector],
+        batch_size: int = SQS_MAX_BATCH_SIZE,
     ) -> bool:
-        message_exist = False
-        host_to_process = self.get_host_to_drain()
-        if host_to_process and (
-            host_to_process.instance_id not in self.draining_host_ttl_cache
-            or host_to_process.attempt > 1  # re-draining shouldn't be avoided due to caching
-        ):
-            self.draining_host_ttl_cache[host_to_process.instance_id] = arrow.now().shift(seconds=DRAIN_CACHE_SECONDS)
-            message_exist = True
-            if host_to_process.scheduler == "mesos":
-                logger.info(f"Mesos host to drain and submit for termination: {host_to_process}")
-                try:
-                    mesos_drain(
-                        mesos_operator_client,
-                        [f"{host_to_process.hostname}|{host_to_process.ip}"],
-                        arrow.now().timestamp * 1000000000,
-                        staticconf.read_int("mesos_maintenance_timeout_seconds", default=600) * 1000000000,
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to drain {host_to_process.hostname} continuing to terminate anyway: {e}")
-                finally:
-                    self.submit_host_for_termination(host_to_process)
-            elif host_to_process.scheduler == "kubernetes":
-                logger.info(f"Kubernetes host to drain and submit for termination: {host_to_process}")
-                spent_time = arrow.now() - arrow.get(host_to_process.draining_start_time)
-                pool_config = staticconf.NamespaceReaders(
-                    POOL_NAMESPACE.format(pool=host_to_process.pool, scheduler="kubernetes")
+        hosts_to_process = []
+        host_to_process = self.get_host_to_drain(max_messages=batch_size)
+        while host_to_process:
+            hosts_to_process.append(host_to_process)
+            if len(hosts_to_process) >= batch_size:
+                break
+            host_to_process = self.get_host_to_drain(buffered_only=True)
+        if not hosts_to_process:
+            return False
+
+        # each host is recorded along with the range of its follow-up submissions
+        processed_hosts: List[Tuple[Host, range]] = []
+        # draining hosts one after the other can take longer than the visibility timeout: messages of the batch
+        # (which all have at least half of it left) are renewed before they can be handed out to other workers
+        visibility_renewal_time = time.monotonic() + self.visibility_timeout_seconds / 2
+        with self._collect_submissions() as submissions:
+            try:
+                for host_to_process in hosts_to_process:
+                    if time.monotonic() >= visibility_renewal_time:
+                        self.extend_drain_messages_visibility(hosts_to_process)
+                        visibility_renewal_time = time.monotonic() + self.visibility_timeout_seconds / 2
+                    first_submission = len(submissions)
+                    if self._mark_host_as_processing(host_to_process):
+                        self._process_host_to_drain(mesos_operator_client, kube_operator_client, host_to_process)
+                    else:
+                        logger.warning(f"Host: {host_to_process.hostname} already being processed, skipping...")
+                    processed_hosts.append((host_to_process, range(first_submission, len(submissions))))
+            finally:
+                # follow-up submissions are sent before their drain messages are deleted, all in batches;
+                # drain messages of hosts whose follow-ups failed are kept, so they get redelivered and retried
+                failed_submissions = self._send_submissions(submissions)
+                hosts_to_delete = []
+                for host, host_submissions in processed_hosts:
+                    if failed_submissions.isdisjoint(host_submissions):
+                        hosts_to_delete.append(host)
+                    else:
+                        self.draining_host_ttl_cache.pop(host.instance_id, None)
+                if hosts_to_delete:
+                    self.delete_drain_messages(hosts_to_delete)
+        return True
+
+    def _process_host_to_drain(
+        self,
+        mesos_operator_client: Optional[Callable[..., Callable[[str], Callable[..., None]]]],
+        kube_operator_client: Optional[KubernetesClusterConnector],
+        host_to_process: Host,
+    ) -> None:
+        if host_to_process.scheduler == "mesos":
+            logger.info(f"Mesos host to drain and submit for termination: {host_to_process}")
+            try:
+                mesos_drain(
+                    mesos_operator_client,
+                    [_hostname_ip(host_to_process)],
+                    arrow.now().timestamp * 1000000000,
+                    staticconf.read_int("mesos_maintenance_timeout_seconds", default=600) * 1000000000,
                 )
-                force_terminate = pool_config.read_bool("draining.force_terminate", DEFAULT_FORCE_TERMINATION)
-                draining_time_threshold_seconds = pool_config.read_int(
-                    "draining.draining_time_threshold_seconds",
-                    default=DEFAULT_DRAINING_TIME_THRESHOLD_SECONDS,
+            except Exception as e:
+                logger.error(f"Failed to drain {host_to_process.hostname} continuing to terminate anyway: {e}")
+            finally:
+                self.submit_host_for_termination(host_to_process)
+        elif host_to_process.scheduler == "kubernetes":
+            logger.info(f"Kubernetes host to drain and submit for termination: {host_to_process}")
+            spent_time = arrow.now() - arrow.get(host_to_process.draining_start_time)
+            pool_config = staticconf.NamespaceReaders(
+                POOL_NAMESPACE.format(pool=host_to_process.pool, scheduler="kubernetes")
+            )
+            force_terminate = pool_config.read_bool("draining.force_terminate", DEFAULT_FORCE_TERMINATION)
+            draining_time_threshold_seconds = pool_config.read_int(
+                "draining.draining_time_threshold_seconds",
+                default=DEFAULT_DRAINING_TIME_THRESHOLD_SECONDS,
+            )
+            redraining_delay_seconds = pool_config.read_int(
+                "draining.redraining_delay_seconds",
+                default=self.global_redraining_delay_seconds,
+            )
+            disable_eviction = host_to_process.termination_reason == REASON_SPOT_INTERRUPTION
+            # Try to drain node; there are a few different possibilities:
+            #  0) host is orphan, getting host information from AWS
+            #       a) host doesn't exist, don't need any action
+            #       b) host doesn't have agent_id (PrivateDnsName), submit it for termination
+            #       c) host exists, submit for draining as non-orphan
+            #  1) threshold expired, it should be terminated since force_terminate is true
+            #  2) threshold expired, it should be uncordoned since force_terminate is false
+            #  3) threshold not expired, drain and terminate node, if it can't submit it for re-draining.
+
+            if not host_to_process.agent_id:  # case 0
+                logger.info(f"Host doesn't have agent_id, it may be orphan: {host_to_process.instance_id}")
+                host_to_process_fresh = host_from_instance_id(
+                    host_to_process.receipt_handle,
+                    host_to_process.instance_id,
+                    host_to_process.pool,
+                    host_to_process.termination_reason,
                 )
-                redraining_delay_seconds = pool_config.read_int(
-                    "draining.redraining_delay_seconds",
-                    default=self.global_redraining_delay_seconds,
+                if not host_to_process_fresh:  # case 0a
+                    logger.info(f"Host doesn't exist: {host_to_process.instance_id}")
+                elif not host_to_process_fresh.agent_id:  # case 0b
+                    logger.info(f"Host doesn't have agent_id: {host_to_process.instance_id}")
+                    self.submit_host_for_termination(host_to_process, delay=0)
+                else:  # case 0c
+                    logger.info(f"Sending host to drain: {host_to_process.instance_id}")
+                    self.submit_host_for_draining(host_to_process_fresh, attempt=host_to_process.attempt + 1)
+            elif spent_time.total_seconds() > draining_time_threshold_seconds:
+                if force_terminate:  # case 1
+                    logger.info(f"Draining expired for: {host_to_process.instance_id}")
+                    self.submit_host_for_termination(host_to_process, delay=0)
+                else:  # case 2
+                    k8s_uncordon(kube_operator_client, host_to_process.agent_id)
+                    #  removing instance_id from cache to avoid unnecessary blocking by cache
+                    self.draining_host_ttl_cache.pop(host_to_process.instance_id, None)
+            elif not self._drain_k8s_host(kube_operator_client, host_to_process, disable_eviction):  # case 3
+                logger.info(
+                    f"Delaying re-draining {host_to_process.instance_id} for {redraining_delay_seconds} seconds"
                 )
-                disable_eviction = host_to_process.termination_reason == TerminationReason.SPOT_INTERRUPTION.value
-                # Try to drain node; there are a few different possibilities:
-                #  0) host is orphan, getting host information from AWS
-                #       a) host doesn't exist, don't need any action
-                #       b) host doesn't have agent_id (PrivateDnsName), submit it for termination
-                #       c) host exists, submit for draining as non-orphan
-                #  1) threshold expired, it should be terminated since force_terminate is true
-                #  2) threshold expired, it should be uncordoned since force_terminate is false
-                #  3) threshold not expired, drain and terminate node, if it can't submit it for re-draining.
-
-                if not host_to_process.agent_id:  # case 0
-                    logger.info(f"Host doesn't have agent_id, it may be orphan: {host_to_process.instance_id}")
-                    host_to_process_fresh = host_from_instance_id(
-                        host_to_process.receipt_handle,
-                        host_to_process.instance_id,
-                        host_to_process.pool,
-                        host_to_process.termination_reason,
-                    )
-                    if not host_to_process_fresh:  # case 0a
-                        logger.info(f"Host doesn't exist: {host_to_process.instance_id}")
-                    elif not host_to_process_fresh.agent_id:  # case 0b
-                        logger.info(f"Host doesn't have agent_id: {host_to_process.instance_id}")
-                        self.submit_host_for_termination(host_to_process, delay=0)
-                    else:  # case 0c
-                        logger.info(f"Sending host to drain: {host_to_process.instance_id}")
-                        self.submit_host_for_draining(host_to_process_fresh, attempt=host_to_process.attempt + 1)
-                elif spent_time.total_seconds() > draining_time_threshold_seconds:
-                    if force_terminate:  # case 1
-                        logger.info(f"Draining expired for: {host_to_process.instance_id}")
-                        self.submit_host_for_termination(host_to_process, delay=0)
-                    else:  # case 2
-                        k8s_uncordon(kube_operator_client, host_to_process.agent_id)
-                        #  removing instance_id from cache to avoid unnecessary blocking by cache
-                        self.draining_host_ttl_cache.pop(host_to_process.instance_id, None)
-                elif not self._drain_k8s_host(kube_operator_client, host_to_process, disable_eviction):  # case 3
-                    logger.info(
-                        f"Delaying re-draining {host_to_process.instance_id} for {redraining_delay_seconds} seconds"
-                    )
-                    self.submit_host_for_draining(
-                        host_to_process, redraining_delay_seconds, host_to_process.attempt + 1
-                    )
-            else:
-                logger.info(f"Host to submit for termination immediately: {host_to_process}")
-                self.submit_host_for_termination(host_to_process, delay=0)
-            self.delete_drain_messages([host_to_process])
+                self.submit_host_for_draining(host_to_process, redraining_delay_seconds, host_to_process.attempt + 1)
+        else:
+            logger.info(f"Host to submit for termination immediately: {host_to_process}")
+            self.submit_host_for_termination(host_to_process, delay=0)
 
-        elif host_to_process:
-            logger.warning(f"Host: {host_to_process.hostname} already being processed, skipping...")
-            self.delete_drain_messages([host_to_process])
-            message_exist = True
-        return message_exist
+    def process_drain_queue_concurrently(
+        self,
+        mesos_operator_client: Optional[Callable[..., Callable[[str], Callable[..., None]]]],
+        kube_operator_client: Optional[KubernetesClusterConnector],
+        num_workers: int = DEFAULT_QUEUE_WORKERS,
+    ) -> bool:
+        """Process up to `num_workers` drain messages in parallel
+
+        :return: True if any message was processed
+        """
+        return self._process_concurrently(
+            self.process_drain_queue, num_workers, mesos_operator_client, kube_operator_client
+        )
+
+    def process_termination_queue_concurrently(
+        self,
+        mesos_operator_client: Optional[Callable[..., Callable[[str], Callable[..., None]]]],
+        kube_operator_client: Optional[KubernetesClusterConnector],
+        num_workers: int = DEFAULT_QUEUE_WORKERS,
+    ) -> bool:
+        """Process up to `num_workers` termination messages in parallel
+
+        :return: True if any message was processed
+        """
+        return self._process_concurrently(
+            self.process_termination_queue, num_workers, mesos_operator_client, kube_operator_client
+        )
+
+    def _process_concurrently(self, process_message: Callable[..., bool], num_workers: int, *args: Any) -> bool:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(process_message, *args) for _ in range(num_workers)]
+        return any([future.result() for future in futures])
+
+    def _mark_host_as_processing(self, host: Host) -> bool:
+        """Record host in the processing cache, unless someone is already taking care of it
+
+        :param Host host: host about to be drained
+        :return: True if the host should be processed
+        """
+        expiration_time = time.monotonic() + DRAIN_CACHE_SECONDS
+        # setdefault is atomic, so no locking is needed to share the cache among queue workers
+        if self.draining_host_ttl_cache.setdefault(host.instance_id, expiration_time) is not expiration_time:
+            if host.attempt <= 1:
+                return False
+            # re-draining shouldn't be avoided due to caching
+            self.draining_host_ttl_cache[host.instance_id] = expiration_time
+        return True
 
     def clean_processing_hosts_cache(self) -> None:
-        hosts_to_remove = []
-        for instance_id, expiration_time in self.draining_host_ttl_cache.items():
-            if arrow.now() > expiration_time:
-                hosts_to_remove.append(instance_id)
-        for host in hosts_to_remove:
-            del self.draining_host_ttl_cache[host]
+        now = time.monotonic()
+        for instance_id, expiration_time in list(self.draining_host_ttl_cache.items()):
+            if now > expiration_time:
+                self.draining_host_ttl_cache.pop(instance_id, None)
 
     def process_warning_queue(self) -> bool:
         message_exist = False
@@ -431,15 +722,18 @@ class DrainingClient:
 
             # we should definitely ignore termination warnings that aren't from this
             # cluster or maybe not even paasta instances...
-            if (
-                host_to_process.group_id in self.spot_fleet_resource_groups
-                or host_to_process.group_id in self.auto_scaling_resource_groups
-            ):
-                logger.info(f"Sending warned host to drain: {host_to_process.hostname}")
-                self.submit_host_for_draining(host_to_process)
-            else:
-                logger.info(f"Ignoring warned host because not in our target group: {host_to_process.hostname}")
-            self.delete_warning_messages([host_to_process])
+            with self._collect_submissions() as submissions:
+                if (
+                    host_to_process.group_id in self.spot_fleet_resource_groups
+                    or host_to_process.group_id in self.auto_scaling_resource_groups
+                ):
+                    logger.info(f"Sending warned host to drain: {host_to_process.hostname}")
+                    self.submit_host_for_draining(host_to_process)
+                else:
+                    logger.info(f"Ignoring warned host because not in our target group: {host_to_process.hostname}")
+            # the warning message is kept if the host couldn't be sent to drain, so it gets retried
+            if not self._send_submissions(submissions):
+                self.delete_warning_messages([host_to_process])
         return message_exist
 
     def _drain_k8s_host(
@@ -485,12 +779,94 @@ class DrainingClient:
         return result
 
 
+def _dumps(payload: Dict[str, Any]) -> str:
+    """Serialize message payload, using orjson (much faster on these small dicts) when available"""
+    return orjson.dumps(payload).decode() if orjson else json.dumps(payload)
+
+
+def _loads(body: str) -> Any:
+    return orjson.loads(body) if orjson else json.loads(body)
+
+
+def _hostname_ip(host: Host) -> str:
+    """Host identifier used by the mesos maintenance API"""
+    return "|".join((host.hostname, host.ip))
+
+
+@lru_cache(maxsize=32)
+def _sender_message_attributes(sender: str) -> Dict[str, Dict[str, str]]:
+    """Message attributes for a given sender, shared across messages: treat them as read-only
+
+    Not using a MappingProxyType here since botocore parameter validation only accepts actual dicts.
+    """
+    return {
+        "Sender": {
+            "DataType": "String",
+            "StringValue": sender,
+        },
+    }
+
+
+class InstanceDetails(NamedTuple):
+    agent_id: str
+    sender: str
+    hostname: str
+    group_id: str
+    ip: str
+    scheduler: str
+
+
+# instance details don't change over the instance lifetime, so they can be shared by repeated lookups
+_instance_details_cache: MutableMapping[str, InstanceDetails] = cachetools.TTLCache(
+    maxsize=INSTANCE_DETAILS_CACHE_SIZE,
+    ttl=INSTANCE_DETAILS_CACHE_SECONDS,
+)
+_instance_details_cache_lock = Lock()
+
+
 def host_from_instance_id(
     receipt_handle: str,
     instance_id: str,
     pool: Optional[str] = None,
     termination_reason: Optional[str] = None,
 ) -> Optional[Host]:
+    details = _get_instance_details(instance_id)
+    if not details:
+        return None
+    return Host(
+        agent_id=details.agent_id,
+        sender=details.sender,
+        receipt_handle=receipt_handle,
+        instance_id=instance_id,
+        hostname=details.hostname,
+        group_id=details.group_id,
+        ip=details.ip,
+        pool=pool if pool else "",  # getting pool information from client code temporary, pool tag will be added to EC2
+        termination_reason=termination_reason if termination_reason else REASON_SPOT_INTERRUPTION,
+        scheduler=details.scheduler,
+        draining_start_time=arrow.now().for_json(),
+    )
+
+
+def _get_instance_details(instance_id: str) -> Optional[InstanceDetails]:
+    """Get instance details needed for draining, caching them to save repeated EC2 and DNS lookups
+
+    Failed lookups are not cached, so they are retried on the next call.
+
+    :param str instance_id: EC2 instance ID
+    :return: instance details, if the instance can be drained
+    """
+    with _instance_details_cache_lock:
+        details = _instance_details_cache.get(instance_id)
+    if details is None:
+        details = _describe_instance(instance_id)
+        if details is not None:
+            with _instance_details_cache_lock:
+                _instance_details_cache[instance_id] = details
+    return details
+
+
+def _describe_instance(instance_id: str) -> Optional[InstanceDetails]:
     try:
         instance_data = ec2_describe_instances(instance_ids=[instance_id])
     except ClientError as e:
@@ -528,23 +904,67 @@ def host_from_instance_id(
     except socket.error:
         logger.warning(f"Couldn't derive hostname from IP via DNS for {ip}")
         return None
-    return Host(
+    return InstanceDetails(
         agent_id=agent_id,
         sender=sender,
-        receipt_handle=receipt_handle,
-        instance_id=instance_id,
         hostname=hostnames[0],
         group_id=group_ids[0],
         ip=ip,
-        pool=pool if pool else "",  # getting pool information from client code temporary, pool tag will be added to EC2
-        termination_reason=termination_reason if termination_reason else TerminationReason.SPOT_INTERRUPTION.value,
         scheduler=scheduler,
-        draining_start_time=arrow.now().for_json(),
     )
 
 
+def _terminate_hosts(hosts: Sequence[Host]) -> List[Host]:
+    """Terminate hosts, concurrently for each resource group
+
+    :param Sequence[Host] hosts: hosts to terminate
+    :return: hosts which were successfully terminated
+    """
+    hosts_by_group = list(_group_hosts_by_resource_group(hosts).values())
+    with ThreadPoolExecutor(max_workers=min(MAX_TERMINATION_THREADS, len(hosts_by_group))) as executor:
+        results = list(executor.map(_try_terminate_hosts, hosts_by_group))
+    return [host for group_hosts, terminated in zip(hosts_by_group, results) if terminated for host in group_hosts]
+
+
+def _try_terminate_hosts(hosts: Sequence[Host]) -> bool:
+    try:
+        terminate_hosts(hosts)
+    except Exception as e:
+        logger.exception(f"Failed to terminate {[host.instance_id for host in hosts]}: {e}")
+        return False
+    return True
+
+
+def _group_hosts_by_resource_group(hosts: Sequence[Host]) -> Dict[Tuple[str, str], List[Host]]:
+    hosts_by_group: Dict[Tuple[str, str], List[Host]] = defaultdict(list)
+    for host in hosts:
+        hosts_by_group[(host.sender, host.group_id)].append(host)
+    return hosts_by_group
+
+
 def terminate_host(host: Host) -> None:
-    logger.info(f"Terminating: {host.instance_id}")
-    resource_group_class = RESOURCE_GROUPS[host.sender]
-    resource_group = resource_group_class(host.group_id)
-    resource_group.terminate_instances_by_id([host.instance_id])
+    terminate_hosts([host])
+
+
+def terminate_hosts(hosts: Sequence[Host]) -> None:
+    """Terminate hosts, with a single termination call for each of their resource groups
+
+    :param Sequence[Host] hosts: hosts to terminate
+    """
+    for (sender, group_id), group_hosts in _group_hosts_by_resource_group(hosts).items():
+        instance_ids = [host.instance_id for host in group_hosts]
+        logger.info(f"Terminating: {', '.join(instance_ids)}")
+        resource_group_class = RESOURCE_GROUPS[sender]
+        resource_group = resource_group_class(group_id)
+        resource_group.terminate_instances_by_id(instance_ids)
+        _forget_instance_details(instance_ids)
+
+
+def _forget_instance_details(instance_ids: Sequence[str]) -> None:
+    """Drop cached details of instances which are gone, rather than letting them linger until expiry
+
+    :param Sequence[str] instance_ids: EC2 instance IDs
+    """
+    with _instance_details_cache_lock:
+        for instance_id in instance_ids:
+            _instance_details_cache.pop(instance_id, None)
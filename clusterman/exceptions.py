@@ -33,6 +33,12 @@ class ClustermanSignalError(ClustermanException):
     pass
 
 
+class DrainingSubmissionError(ClustermanException):
+    """Raised when some draining client messages could not be sent"""
+
+    pass
+
+
 class MetricsError(ClustermanException):
     pass
 
@@ -13,6 +13,8 @@
 # limitations under the License.
 from abc import ABCMeta
 from abc import abstractmethod
+from typing import Iterable
+from typing import Mapping
 from typing import Optional
 
 import staticconf
@@ -46,6 +48,14 @@ class ClusterConnector(metaclass=ABCMeta):
             return AgentMetadata()
         return self._get_agent_metadata(ip_address)
 
+    def get_agent_metadata_bulk(self, ip_addresses: Iterable[Optional[str]]) -> Mapping[Optional[str], AgentMetadata]:
+        """Get metadata about multiple cluster agents in one pass over the currently loaded state
+
+        :param ip_addresses: the IP addresses of the agents in question
+        :returns: mapping from each IP address to the metadata of the corresponding agent
+        """
+        return {ip_address: self.get_agent_metadata(ip_address) for ip_address in set(ip_addresses)}
+
     @abstractmethod
     def get_resource_allocation(self, resource_name: str) -> float:  # pragma: no cover
         """Get the total amount of the given resource currently allocated for this pool.
@@ -13,6 +13,9 @@
 # limitations under the License.
 import copy
 from collections import defaultdict
+from multiprocessing.synchronize import Event as EventBase
+from typing import Any
+from typing import Dict
 from typing import List
 from typing import Mapping
 from typing import Optional
@@ -35,6 +38,8 @@ from kubernetes.client.rest import ApiException
 from clusterman.interfaces.cluster_connector import ClusterConnector
 from clusterman.interfaces.types import AgentMetadata
 from clusterman.interfaces.types import AgentState
+from clusterman.kubernetes.pool_event_watcher import PoolEventWatcher
+from clusterman.kubernetes.uptime_index import UptimeIndex
 from clusterman.kubernetes.util import allocated_node_resources
 from clusterman.kubernetes.util import CachedCoreV1Api
 from clusterman.kubernetes.util import ConciseCRDApi
@@ -47,6 +52,7 @@ from clusterman.kubernetes.util import total_node_resources
 from clusterman.kubernetes.util import total_pod_resources
 from clusterman.migration.event import MigrationEvent
 from clusterman.migration.event_enums import MigrationStatus
+from clusterman.util import ClustermanResources
 from clusterman.util import strtobool
 
 
@@ -73,9 +79,13 @@ class KubernetesClusterConnector(ClusterConnector):
     _prev_nodes_by_ip: Mapping[str, KubernetesNode]
     _nodes_by_ip: Mapping[str, KubernetesNode]
     _unschedulable_pods: List[KubernetesPod]
+    _unschedulable_pods_with_reason: List[Tuple[KubernetesPod, PodUnschedulableReason]]
+    _pending_resources: ClustermanResources
     _excluded_pods_by_ip: Mapping[str, List[KubernetesPod]]
     _pods_by_ip: Mapping[str, List[KubernetesPod]]
     _label_selectors: List[str]
+    _resource_versions: Dict[str, Optional[str]]
+    _pool_event_watcher: Optional[PoolEventWatcher]
 
     def __init__(self, cluster: str, pool: Optional[str], init_crd: bool = False) -> None:
         super().__init__(cluster, pool)
@@ -87,6 +97,8 @@ class KubernetesClusterConnector(ClusterConnector):
         self._nodes_by_ip = {}
         self._init_crd_client = init_crd
         self._label_selectors = []
+        self._resource_versions = {}
+        self._pool_event_watcher = None
         if self.pool:
             # TODO(CLUSTERMAN-659): Switch to using just pool_label_key once the new node labels are applied everywhere
             node_label_selector = self.pool_config.read_string(
@@ -95,15 +107,19 @@ class KubernetesClusterConnector(ClusterConnector):
             )
             self._label_selectors.append(f"{node_label_selector}={self.pool}")
 
-    def reload_state(self, load_pods_info: bool = True) -> None:
+    def reload_state(self, load_pods_info: Optional[bool] = True) -> None:
         """Reload information from cluster/pool
 
-        :param bool load_pods_info: do not load data about pods.
-                                    NOTE: all resouce utilization metrics won't be available when setting this
+        :param Optional[bool] load_pods_info: do not load data about pods.
+                                              NOTE: all resouce utilization metrics won't be available when setting this
+                                              If None, pod data from the previous reload is kept (if any).
         """
         logger.info("Reloading nodes")
 
         self.reload_client()
+        if self._pool_event_watcher:
+            # events received so far are accounted for by this reload
+            self._pool_event_watcher.discard_pending()
 
         # store the previous _nodes_by_ip for use in get_removed_nodes_before_last_reload()
         self._prev_nodes_by_ip = copy.deepcopy(self._nodes_by_ip)
@@ -115,12 +131,17 @@ class KubernetesClusterConnector(ClusterConnector):
                 if self.pool_config.read_bool("use_labels_for_pods", default=False)
                 else self._get_pods_info()
             )
+        elif load_pods_info is None and hasattr(self, "_pods_by_ip"):
+            logger.info("Keeping pods from previous reload")
+            # nodes may have joined or left since pods were listed
+            self._pods_by_ip = {node_ip: self._pods_by_ip.get(node_ip, []) for node_ip in self._nodes_by_ip}
         else:
             self._pods_by_ip, self._unschedulable_pods, self._excluded_pods_by_ip = (
                 dict.fromkeys(self._nodes_by_ip, []),
                 [],
                 {},
             )
+        self._reload_pending_pods_info()
 
     def reload_client(self) -> None:
         self._core_api = CachedCoreV1Api(self.kubeconfig_path)
@@ -152,10 +173,7 @@ class KubernetesClusterConnector(ClusterConnector):
         return max(0, len(previous_nodes) - len(current_nodes))
 
     def get_resource_pending(self, resource_name: str) -> float:
-        return getattr(
-            allocated_node_resources([p for p, __ in self.get_unschedulable_pods()]),
-            resource_name,
-        )
+        return getattr(self._pending_resources, resource_name)
 
     def get_resource_allocation(self, resource_name: str) -> float:
         return sum(getattr(allocated_node_resources(pod), resource_name) for pod in self._pods_by_ip.values())
@@ -183,10 +201,7 @@ class KubernetesClusterConnector(ClusterConnector):
     def get_unschedulable_pods(
         self,
     ) -> List[Tuple[KubernetesPod, PodUnschedulableReason]]:
-        unschedulable_pods = []
-        for pod in self._unschedulable_pods:
-            unschedulable_pods.append((pod, self._get_pod_unschedulable_reason(pod)))
-        return unschedulable_pods
+        return list(self._unschedulable_pods_with_reason)
 
     def drain_node(self, node_name: str, disable_eviction: bool) -> bool:
         try:
@@ -309,6 +324,80 @@ class KubernetesClusterConnector(ClusterConnector):
             reason == PodUnschedulableReason.InsufficientResources for _, reason in self.get_unschedulable_pods()
         )
 
+    def wait_for_pool_events(
+        self,
+        timeout_seconds: float,
+        watch_pods: bool = True,
+        stop_event: Optional[EventBase] = None,
+    ) -> bool:
+        """Block until an event which may affect pool health is received from the k8s watch API
+
+        Only node additions/removals and updates to pending pods of the pool are considered
+        relevant, as those are the only events which can change capacity or pod schedulability.
+        Watch streams are started on first use, resuming from the resource version of the last reload,
+        and then kept running in the background until `stop_watching_pool_events` is called.
+        Bursts of events are coalesced, so that the caller is woken up at most once every few seconds.
+
+        :param float timeout_seconds: max time to wait for an event
+        :param bool watch_pods: if set, also watch for pod events (which are then followed until stopped)
+        :param Optional[EventBase] stop_event: if set while waiting, return early
+        :return: True if a relevant event was received before timing out
+        """
+        if not self._pool_event_watcher:
+            self._pool_event_watcher = PoolEventWatcher()
+        self._pool_event_watcher.follow(
+            "nodes",
+            self._core_api.list_node,
+            self._get_node_watch_kwargs(),
+            self._is_relevant_node_event,
+            self._resource_versions.get("nodes"),
+        )
+        if watch_pods:
+            self._pool_event_watcher.follow(
+                "pods",
+                self._core_api.list_pod_for_all_namespaces,
+                self._get_pod_watch_kwargs(),
+                self._is_relevant_pod_event,
+                self._resource_versions.get("pods"),
+            )
+        if self._pool_event_watcher.wait(timeout_seconds, stop_event):
+            logger.info("Received relevant pool events")
+            return True
+        return False
+
+    def stop_watching_pool_events(self) -> None:
+        """Stop the watch streams started by `wait_for_pool_events`, if any"""
+        if self._pool_event_watcher:
+            self._pool_event_watcher.stop()
+            self._pool_event_watcher = None
+
+    def build_node_uptime_index(self) -> UptimeIndex:
+        """Start tracking pool nodes by creation time
+
+        :return: uptime index, kept up to date in the background until stopped
+        """
+        uptime_index = UptimeIndex(CachedCoreV1Api(self.kubeconfig_path), self._get_node_watch_kwargs())
+        uptime_index.start()
+        return uptime_index
+
+    def _get_node_watch_kwargs(self) -> Dict[str, Any]:
+        return {"label_selector": ",".join(self._label_selectors)} if self._label_selectors else {}
+
+    def _get_pod_watch_kwargs(self) -> Dict[str, Any]:
+        # only pending pods matter, so the API server can leave out most of the pod churn of the cluster
+        watch_kwargs = {"field_selector": "status.phase=Pending"}
+        if self.pool_config.read_bool("use_labels_for_pods", default=False):
+            watch_kwargs["label_selector"] = f"{self.pool_label_key}={self.pool}"
+        return watch_kwargs
+
+    def _is_relevant_node_event(self, event: Dict[str, Any]) -> bool:
+        # node objects get modified constantly by kubelet heartbeats, only membership changes matter here
+        return event["type"] in ("ADDED", "DELETED")
+
+    def _is_relevant_pod_event(self, event: Dict[str, Any]) -> bool:
+        pod = event["object"]
+        return bool(pod.status and pod.status.phase == "Pending" and self._pod_belongs_to_pool(pod))
+
     def _evict_or_delete_pods(self, node_name: str, pods: List[KubernetesPod], disable_eviction: bool) -> bool:
         all_done = True
         action_name = "deleted" if disable_eviction else "evicted"
@@ -393,6 +482,15 @@ class KubernetesClusterConnector(ClusterConnector):
                 return True
         return False
 
+    def _reload_pending_pods_info(self) -> None:
+        """Classify unschedulable pods and sum up their resources once per reload,
+        so that pending resource metrics and pod health checks don't need to walk them again.
+        """
+        self._unschedulable_pods_with_reason = [
+            (pod, self._get_pod_unschedulable_reason(pod)) for pod in self._unschedulable_pods
+        ]
+        self._pending_resources = allocated_node_resources(self._unschedulable_pods)
+
     def _get_pod_unschedulable_reason(self, pod: KubernetesPod) -> PodUnschedulableReason:
         pod_resource_request = total_pod_resources(pod)
         for node_ip, pods_on_node in self._pods_by_ip.items():
@@ -442,9 +540,9 @@ class KubernetesClusterConnector(ClusterConnector):
         return True
 
     def _get_nodes_by_ip(self) -> Mapping[str, KubernetesNode]:
-        kwargs = {"label_selector": ",".join(self._label_selectors)} if self._label_selectors else {}
-        pool_nodes = self._core_api.list_node(**kwargs).items
-        return {get_node_ip(node): node for node in pool_nodes}
+        node_list = self._core_api.list_node(**self._get_node_watch_kwargs())
+        self._resource_versions["nodes"] = node_list.metadata.resource_version
+        return {get_node_ip(node): node for node in node_list.items}
 
     def _get_pods_info(
         self,
@@ -457,8 +555,9 @@ class KubernetesClusterConnector(ClusterConnector):
             "exclude_daemonset_pods",
             default=staticconf.read_bool("exclude_daemonset_pods", default=False),
         )
-        all_pods = self._core_api.list_pod_for_all_namespaces().items
-        for pod in all_pods:
+        pod_list = self._core_api.list_pod_for_all_namespaces()
+        self._resource_versions["pods"] = pod_list.metadata.resource_version
+        for pod in pod_list.items:
             if self._pod_belongs_to_pool(pod):
                 if exclude_daemonset_pods and self._pod_belongs_to_daemonset(pod):
                     excluded_pods_by_ip[pod.status.host_ip].append(pod)
@@ -481,7 +580,9 @@ class KubernetesClusterConnector(ClusterConnector):
         )
         label_selector = f"{self.pool_label_key}={self.pool}"
 
-        for pod in self._core_api.list_pod_for_all_namespaces(label_selector=label_selector).items:
+        pod_list = self._core_api.list_pod_for_all_namespaces(label_selector=label_selector)
+        self._resource_versions["pods"] = pod_list.metadata.resource_version
+        for pod in pod_list.items:
             if exclude_daemonset_pods and self._pod_belongs_to_daemonset(pod):
                 excluded_pods_by_ip[pod.status.host_ip].append(pod)
             elif pod.status.phase == "Running" or self._is_recently_scheduled(pod):
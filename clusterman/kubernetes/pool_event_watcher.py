@@ -0,0 +1,151 @@
+# Copyright 2019 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from multiprocessing.synchronize import Event as EventBase
+from threading import Event
+from threading import Lock
+from threading import Thread
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+import colorlog
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+
+logger = colorlog.getLogger(__name__)
+GONE_STATUS = 410
+POOL_EVENTS_WATCH_TIMEOUT_SECONDS = 5 * 60
+POOL_EVENTS_RETRY_WAIT_SECONDS = 10
+POOL_EVENTS_MIN_WAKEUP_INTERVAL_SECONDS = 5
+POOL_EVENTS_STOP_POLL_SECONDS = 1
+
+
+class PoolEventWatcher:
+    def __init__(self, min_wakeup_interval: float = POOL_EVENTS_MIN_WAKEUP_INTERVAL_SECONDS) -> None:
+        """Long-lived k8s watch streams, signalling events which may affect pool health
+
+        Relevant events are coalesced into a single pending wakeup, and wakeups are rate limited,
+        so that bursts of events (i.e. pods being evicted during a drain) do not cause a burst of reloads.
+
+        :param float min_wakeup_interval: minimum time in seconds between two wakeups
+        """
+        self._min_wakeup_interval = min_wakeup_interval
+        self._last_wakeup = float("-inf")
+        self._relevant_event = Event()
+        self._stop_event = Event()
+        self._lock = Lock()
+        self._watchers: Dict[str, kubernetes.watch.Watch] = {}
+
+    def follow(
+        self,
+        resource: str,
+        list_func: Callable,
+        list_kwargs: Dict[str, Any],
+        is_relevant: Callable[[Dict[str, Any]], bool],
+        resource_version: Optional[str],
+    ) -> None:
+        """Start following events for a resource type in a daemon thread, unless already doing so
+
+        :param str resource: name of the resource type
+        :param Callable list_func: k8s API listing function for the resource type
+        :param Dict[str, Any] list_kwargs: extra parameters for listing (i.e. label and field selectors)
+        :param Callable is_relevant: filter for events which should cause a wakeup
+        :param Optional[str] resource_version: cursor to start from, i.e. the one of the last full listing
+        """
+        with self._lock:
+            if resource in self._watchers:
+                return
+            watcher = kubernetes.watch.Watch()
+            self._watchers[resource] = watcher
+        Thread(
+            target=self._follow_events,
+            args=(watcher, resource, list_func, list_kwargs, is_relevant, resource_version),
+            daemon=True,
+        ).start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._lock:
+            for watcher in self._watchers.values():
+                watcher.stop()
+
+    def discard_pending(self) -> None:
+        """Drop the pending wakeup, if any, as a full reload already accounts for the events received so far"""
+        self._relevant_event.clear()
+
+    def wait(self, timeout_seconds: float, stop_event: Optional[EventBase] = None) -> bool:
+        """Block until a relevant event is received
+
+        :param float timeout_seconds: max time to wait for an event
+        :param Optional[EventBase] stop_event: if set while waiting, return early
+        :return: True if a relevant event was received before timing out
+        """
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            now = time.monotonic()
+            if now >= deadline or (stop_event and stop_event.is_set()):
+                return False
+            earliest_wakeup = self._last_wakeup + self._min_wakeup_interval
+            if self._relevant_event.is_set() and now >= earliest_wakeup:
+                self._relevant_event.clear()
+                self._last_wakeup = now
+                return True
+            wait_seconds = min(POOL_EVENTS_STOP_POLL_SECONDS, deadline - now)
+            if self._relevant_event.is_set():
+                # anything else received while rate limited gets folded into the same wakeup
+                time.sleep(min(wait_seconds, earliest_wakeup - now))
+            else:
+                self._relevant_event.wait(wait_seconds)
+
+    def _follow_events(
+        self,
+        watcher: kubernetes.watch.Watch,
+        resource: str,
+        list_func: Callable,
+        list_kwargs: Dict[str, Any],
+        is_relevant: Callable[[Dict[str, Any]], bool],
+        resource_version: Optional[str],
+    ) -> None:
+        # the cursor is local to this thread, the one of the caller only gets read when starting
+        while not self._stop_event.is_set():
+            try:
+                if not resource_version:
+                    # without a cursor the API server would replay all existing objects as ADDED,
+                    # and a single item is enough to get one
+                    resource_version = list_func(limit=1, **list_kwargs).metadata.resource_version
+                for event in watcher.stream(
+                    list_func,
+                    resource_version=resource_version,
+                    timeout_seconds=POOL_EVENTS_WATCH_TIMEOUT_SECONDS,
+                    **list_kwargs,
+                ):
+                    if event["type"] == "ERROR" and event["raw_object"].get("code") == GONE_STATUS:
+                        raise ApiException(status=GONE_STATUS)
+                    resource_version = watcher.resource_version
+                    if is_relevant(event):
+                        self._relevant_event.set()
+            except ApiException as e:
+                if e.status != GONE_STATUS:
+                    logger.warning(f"Failed watching {resource} events: {e}")
+                    self._stop_event.wait(POOL_EVENTS_RETRY_WAIT_SECONDS)
+                else:
+                    logger.info(f"Watch cursor for {resource} expired, re-listing")
+                resource_version = None
+            except Exception as e:
+                logger.warning(f"Failed watching {resource} events: {e}")
+                resource_version = None
+                self._stop_event.wait(POOL_EVENTS_RETRY_WAIT_SECONDS)
@@ -0,0 +1,128 @@
+# Copyright 2019 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from threading import Event
+from threading import Lock
+from threading import Thread
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import colorlog
+import kubernetes
+from kubernetes.client.models.v1_node import V1Node as KubernetesNode
+from kubernetes.client.rest import ApiException
+from sortedcontainers import SortedList
+
+
+logger = colorlog.getLogger(__name__)
+GONE_STATUS = 410
+UPTIME_INDEX_WATCH_TIMEOUT_SECONDS = 5 * 60
+UPTIME_INDEX_RETRY_WAIT_SECONDS = 10
+
+
+class UptimeIndex:
+    def __init__(self, core_api: kubernetes.client.CoreV1Api, list_kwargs: Dict[str, Any]) -> None:
+        """Index of pool nodes sorted by creation time, kept up to date by a k8s watch stream
+
+        :param CoreV1Api core_api: k8s core API client
+        :param Dict[str, Any] list_kwargs: extra parameters for node listing (i.e. label selectors)
+        """
+        self._core_api = core_api
+        self._list_kwargs = list_kwargs
+        self._index: SortedList = SortedList()
+        self._creation_by_name: Dict[str, float] = {}
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._watcher: Optional[kubernetes.watch.Watch] = None
+        self._resource_version: Optional[str] = None
+
+    def start(self) -> None:
+        """Populate the index and start following node events in a daemon thread"""
+        self._relist()
+        Thread(target=self._follow_node_events, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._watcher:
+            self._watcher.stop()
+
+    def nodes_older_than(self, timestamp: float) -> List[str]:
+        """Get nodes created before a certain time
+
+        :param float timestamp: creation time threshold
+        :return: names of the nodes, oldest first
+        """
+        with self._lock:
+            # 1-tuples sort before any (timestamp, name) pair with the same timestamp
+            return [name for _, name in self._index[: self._index.bisect_left((timestamp,))]]
+
+    def _relist(self) -> None:
+        node_list = self._core_api.list_node(**self._list_kwargs)
+        with self._lock:
+            self._index.clear()
+            self._creation_by_name.clear()
+            for node in node_list.items:
+                self._upsert(node)
+        self._resource_version = node_list.metadata.resource_version
+
+    def _follow_node_events(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if not self._resource_version:
+                    self._relist()
+                self._watcher = kubernetes.watch.Watch()
+                for event in self._watcher.stream(
+                    self._core_api.list_node,
+                    resource_version=self._resource_version,
+                    timeout_seconds=UPTIME_INDEX_WATCH_TIMEOUT_SECONDS,
+                    **self._list_kwargs,
+                ):
+                    if event["type"] == "ERROR" and event["raw_object"].get("code") == GONE_STATUS:
+                        raise ApiException(status=GONE_STATUS)
+                    self._resource_version = self._watcher.resource_version
+                    self._apply_event(event)
+            except ApiException as e:
+                if e.status != GONE_STATUS:
+                    logger.warning(f"Failed watching node events for uptime index: {e}")
+                    self._stop_event.wait(UPTIME_INDEX_RETRY_WAIT_SECONDS)
+                self._resource_version = None
+            except Exception as e:
+                logger.warning(f"Failed watching node events for uptime index: {e}")
+                self._resource_version = None
+                self._stop_event.wait(UPTIME_INDEX_RETRY_WAIT_SECONDS)
+
+    def _apply_event(self, event: Dict[str, Any]) -> None:
+        node = event["object"]
+        with self._lock:
+            if event["type"] == "DELETED":
+                self._remove(node.metadata.name)
+            elif event["type"] in ("ADDED", "MODIFIED"):
+                self._upsert(node)
+
+    def _upsert(self, node: KubernetesNode) -> None:
+        self._remove(node.metadata.name)
+        entry = self._get_entry(node)
+        self._creation_by_name[node.metadata.name] = entry[0]
+        self._index.add(entry)
+
+    def _remove(self, node_name: str) -> None:
+        creation = self._creation_by_name.pop(node_name, None)
+        if creation is not None:
+            self._index.discard((creation, node_name))
+
+    @staticmethod
+    def _get_entry(node: KubernetesNode) -> Tuple[float, str]:
+        return node.metadata.creation_timestamp.timestamp(), node.metadata.name
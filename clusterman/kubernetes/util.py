@@ -17,6 +17,7 @@ import socket
 from enum import auto
 from enum import Enum
 from functools import partial
+from functools import wraps
 from typing import Any
 from typing import Hashable
 from typing import List
@@ -88,7 +89,11 @@ class CachedCoreV1Api(KubeApiClientWrapper):
         if os.environ.get("KUBE_CACHE_ENABLED", "") and attr in self.CACHED_FUNCTION_CALLS:
 
             def decorator(f):
+                # keeping the docstring is needed for kubernetes.watch to infer the returned object type
+                @wraps(f)
                 def wrapper(*args, **kwargs):
+                    if kwargs.get("watch"):
+                        return f(*args, **kwargs)  # streaming responses can't be cached
                     k = hashkey(attr, *args, **kwargs)
                     try:
                         return KUBERNETES_API_CACHE[k]
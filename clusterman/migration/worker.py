@@ -11,14 +11,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import heapq
 import time
+from functools import lru_cache
 from functools import partial
-from multiprocessing import Process
+from multiprocessing import Event
+from multiprocessing import get_all_start_methods
+from multiprocessing import get_context
+from multiprocessing.synchronize import Event as EventBase
 from multiprocessing.synchronize import Lock as LockBase
-from statistics import mean
 from typing import Callable
 from typing import cast
 from typing import Collection
+from typing import FrozenSet
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 import colorlog
 
@@ -31,14 +39,21 @@ from clusterman.interfaces.types import ClusterNodeMetadata
 from clusterman.kubernetes.kubernetes_cluster_connector import KubernetesClusterConnector
 from clusterman.migration.event import MigrationEvent
 from clusterman.migration.settings import WorkerSetup
+from clusterman.monitoring_lib import CounterProtocol
+from clusterman.monitoring_lib import GaugeProtocol
 from clusterman.monitoring_lib import get_monitoring_client
-from clusterman.util import limit_function_runtime
+from clusterman.monitoring_lib import TimerProtocol
 
 
 logger = colorlog.getLogger(__name__)
 UPTIME_CHECK_INTERVAL_SECONDS = 60 * 60  # 1 hour
 INITIAL_POOL_HEALTH_TIMEOUT_SECONDS = 15 * 60
+WORKER_STOP_GRACE_PERIOD_SECONDS = 10
+HEALTH_CHECK_MAX_BACKOFF_STEPS = 3  # safety net refreshes are at most 8 health check intervals apart
+POOL_LOCK_WAIT_SLICE_SECONDS = 5
 SUPPORTED_POOL_SCHEDULER = "kubernetes"
+# forking lets (re)started workers inherit the already initialized interpreter, rather than re-importing everything
+WORKER_PROCESS_CONTEXT = get_context("fork" if "fork" in get_all_start_methods() else None)
 
 SFX_NODE_DRAIN_COUNT = "clusterman.node_migration.drain_count"
 SFX_MIGRATION_JOB_DURATION = "clusterman.node_migration.duration"
@@ -46,24 +61,67 @@ SFX_DRAINED_NODE_UPTIME = "clusterman.node_migration.drained_node_uptime"
 
 
 class RestartableDaemonProcess:
-    def __init__(self, target, args, kwargs) -> None:
+    __slots__ = ("__target", "__args", "__kwargs", "stop_event", "process_handle")
+
+    def __init__(self, target, args, kwargs, stop_event: Optional[EventBase] = None) -> None:
+        """Daemon process which can be restarted with the same parameters
+
+        :param Callable target: process routine
+        :param tuple args: routine positional arguments
+        :param dict kwargs: routine keyword arguments
+        :param Optional[EventBase] stop_event: event listened to by the routine, set to request it to return early
+        """
         self.__target = target
         self.__args = args
         self.__kwargs = kwargs
+        self.stop_event = stop_event
         self._init_proc_handle()
 
     def _init_proc_handle(self):
-        self.process_handle = Process(target=self.__target, args=self.__args, kwargs=self.__kwargs)
+        self.process_handle = WORKER_PROCESS_CONTEXT.Process(
+            target=self.__target,
+            args=self.__args,
+            kwargs=self.__kwargs,
+        )
         self.process_handle.daemon = True
 
     def restart(self):
+        if self.stop_event and self.process_handle.is_alive():
+            self.stop_event.set()
+            self.process_handle.join(WORKER_STOP_GRACE_PERIOD_SECONDS)
         if self.process_handle.is_alive():
             self.process_handle.kill()
+        if self.stop_event:
+            self.stop_event.clear()
         self._init_proc_handle()
         self.process_handle.start()
 
-    def __getattr__(self, attr):
-        return getattr(self.process_handle, attr)
+    def start(self) -> None:
+        self.process_handle.start()
+
+    def is_alive(self) -> bool:
+        return self.process_handle.is_alive()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self.process_handle.join(timeout)
+
+    def kill(self) -> None:
+        self.process_handle.kill()
+
+    def terminate(self) -> None:
+        self.process_handle.terminate()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process_handle.pid
+
+    @property
+    def exitcode(self) -> Optional[int]:
+        return self.process_handle.exitcode
+
+    @property
+    def name(self) -> str:
+        return self.process_handle.name
 
 
 class NodeMigrationError(Exception):
@@ -76,75 +134,163 @@ def _monitor_pool_health(
     drained: Collection[ClusterNodeMetadata],
     health_check_interval_seconds: int,
     ignore_pod_health: bool = False,
+    stop_event: Optional[EventBase] = None,
 ) -> bool:
     """Monitor pool health after nodes were submitted for draining
 
     :param PoolManager manager: pool manager instance
     :param float timeout: timestamp after which giving up
     :param Collection[ClusterNodeMetadata] drained: nodes which were submitted for draining
+    :param int health_check_interval_seconds: initial time between checks when no relevant k8s event is received
     :param bool ignore_pod_health: If set, do not check that pods can successfully be scheduled
+    :param Optional[EventBase] stop_event: if set while monitoring, give up early
     :return: true if capacity is fulfilled
     """
     draining_happened, capacity_satisfied, pods_healthy = False, False, False
     connector = cast(KubernetesClusterConnector, manager.cluster_connector)
     logger.info(f"Monitoring health for {manager.cluster}:{manager.pool}")
+    backoff_step = 0
     while time.time() < timeout:
+        previous_status = (draining_happened, capacity_satisfied, pods_healthy)
         manager.reload_state(load_pods_info=not ignore_pod_health)
-        draining_happened = draining_happened or not any(
-            node.agent.agent_id == connector.get_agent_metadata(node.instance.ip_address).agent_id for node in drained
-        )
-        # TODO: replace these with use of walrus operator in if-statement once on py38
-        capacity_satisfied = capacity_satisfied or (draining_happened and manager.is_capacity_satisfied())
-        pods_healthy = pods_healthy or (
-            draining_happened and (ignore_pod_health or connector.has_enough_capacity_for_pods())
-        )
+        # conditions are checked in order, and each one stops being evaluated once it has been met
+        if not draining_happened:
+            agents = connector.get_agent_metadata_bulk(node.instance.ip_address for node in drained)
+            draining_happened = not any(
+                node.agent.agent_id == agents[node.instance.ip_address].agent_id for node in drained
+            )
+        if draining_happened and not capacity_satisfied:
+            capacity_satisfied = manager.is_capacity_satisfied()
+        if draining_happened and not pods_healthy:
+            pods_healthy = ignore_pod_health or connector.has_enough_capacity_for_pods()
         if draining_happened and capacity_satisfied and pods_healthy:
             return True
         else:
+            # lazy formatting, as this runs on every health check
             logger.info(
-                f"Pool {manager.cluster}:{manager.pool} not healthy yet"
-                f" (drain_ok={draining_happened}, capacity_ok={capacity_satisfied}, pods_ok={pods_healthy})"
+                "Pool %s:%s not healthy yet (drain_ok=%s, capacity_ok=%s, pods_ok=%s)",
+                manager.cluster,
+                manager.pool,
+                draining_happened,
+                capacity_satisfied,
+                pods_healthy,
             )
-        time.sleep(health_check_interval_seconds)
+        # re-check as soon as nodes or pending pods change, periodically refreshing anyway as a safety net:
+        # the refresh period starts at the health check interval, and backs off exponentially while nothing progresses
+        if (draining_happened, capacity_satisfied, pods_healthy) != previous_status:
+            backoff_step = 0
+        remaining_seconds = timeout - time.time()
+        if remaining_seconds <= 0:
+            break
+        connector.wait_for_pool_events(
+            timeout_seconds=min(
+                health_check_interval_seconds * 2 ** min(backoff_step, HEALTH_CHECK_MAX_BACKOFF_STEPS),
+                remaining_seconds,
+            ),
+            watch_pods=not ignore_pod_health,
+            stop_event=stop_event,
+        )
+        if stop_event and stop_event.is_set():
+            break
+        backoff_step += 1
     return False
 
 
+@lru_cache(maxsize=None)
+def _get_monitoring_handles(cluster: str, pool: str) -> Tuple[CounterProtocol, TimerProtocol, GaugeProtocol]:
+    """Get metric handles for node draining, reused across drain selections of the same pool"""
+    monitoring_client = get_monitoring_client()
+    monitoring_info = {"cluster": cluster, "pool": pool}
+    return (
+        monitoring_client.create_counter(SFX_NODE_DRAIN_COUNT, monitoring_info),
+        monitoring_client.create_timer(SFX_MIGRATION_JOB_DURATION, monitoring_info),
+        monitoring_client.create_gauge(SFX_DRAINED_NODE_UPTIME, monitoring_info),
+    )
+
+
+def _is_agent_in(agent_ids: FrozenSet[str], node: ClusterNodeMetadata) -> bool:
+    return node.agent.agent_id in agent_ids
+
+
 def _drain_node_selection(
-    manager: PoolManager, selector: Callable[[ClusterNodeMetadata], bool], worker_setup: WorkerSetup
+    manager: PoolManager,
+    selector: Callable[[ClusterNodeMetadata], bool],
+    worker_setup: WorkerSetup,
+    stop_event: Optional[EventBase] = None,
+    deadline: Optional[float] = None,
 ) -> bool:
     """Drain nodes in pool according to selection criteria
 
     :param PoolManager manager: pool manager instance
     :param Callable[[ClusterNodeMetadata], bool] selector: selection filter
     :param WorkerSetup worker_setup: node migration setup
+    :param Optional[EventBase] stop_event: if set while draining, stop before the next chunk
+    :param Optional[float] deadline: timestamp after which no more chunks are started
     :return: true if completed
     """
+    stop_event = stop_event or Event()
     nodes = manager.get_node_metadatas(AWS_RUNNING_STATES)
-    selected = sorted(filter(selector, nodes), key=worker_setup.precedence.sort_key)
-    if not selected:
+    # sort keys are computed once, and the node index breaks ties (keeping the original order)
+    selection_heap = [
+        (worker_setup.precedence.sort_key(node), i, node) for i, node in enumerate(filter(selector, nodes))
+    ]
+    if not selection_heap:
         return True
-    monitoring_info = {"cluster": manager.cluster, "pool": manager.pool}
-    node_drain_counter = get_monitoring_client().create_counter(SFX_NODE_DRAIN_COUNT, monitoring_info)
-    job_timer = get_monitoring_client().create_timer(SFX_MIGRATION_JOB_DURATION, monitoring_info)
-    node_uptime_gauge = get_monitoring_client().create_gauge(SFX_DRAINED_NODE_UPTIME, monitoring_info)
+    heapq.heapify(selection_heap)
+    selection_size, recycled_count = len(selection_heap), 0
+    node_drain_counter, job_timer, node_uptime_gauge = _get_monitoring_handles(manager.cluster, manager.pool)
     chunk = worker_setup.rate.of(len(nodes))
-    logger.info(f"{len(selected)} nodes of {manager.cluster}:{manager.pool} will be recycled")
+    logger.info(f"{selection_size} nodes of {manager.cluster}:{manager.pool} will be recycled")
     job_timer.start()
-    for i in range(0, len(selected), chunk):
+    while selection_heap:
         start_time = time.time()
-        selection_chunk = selected[i : i + chunk]
+        if deadline and start_time > deadline:
+            logger.warning(f"Ran out of time, interrupting draining for {manager.cluster}:{manager.pool}")
+            job_timer.stop()
+            return False
+        # after the first chunk, pool state was reloaded while monitoring health: skip nodes which went away since
+        running_instance_ids = (
+            {node.instance.instance_id for node in manager.get_node_metadatas(AWS_RUNNING_STATES)}
+            if recycled_count
+            else None
+        )
+        selection_chunk: List[ClusterNodeMetadata] = []
+        while selection_heap and len(selection_chunk) < chunk:
+            node = heapq.heappop(selection_heap)[2]
+            if running_instance_ids is None or node.instance.instance_id in running_instance_ids:
+                selection_chunk.append(node)
+        if not selection_chunk:
+            break
+        chunk_size = len(selection_chunk)
+        # submissions are only buffered, and then sent out in batches by a single flush
+        try:
+            for node in selection_chunk:
+                manager.submit_for_draining(node, TerminationReason.NODE_MIGRATION)
+        finally:
+            # submissions are buffered, so whatever went through must still be sent out
+            manager.flush_draining_submissions()
+        chunk_instance_ids = ",".join(node.instance.instance_id for node in selection_chunk)
+        logger.info("Recycling %d nodes: %s", chunk_size, chunk_instance_ids)
         for node in selection_chunk:
-            logger.info(f"Recycling node {node.instance.instance_id}")
-            manager.submit_for_draining(node, TerminationReason.NODE_MIGRATION)
+            logger.debug("Recycling node %s", node.instance.instance_id)
             node_uptime_gauge.set(node.instance.uptime.total_seconds())
-            node_drain_counter.count()
-        time.sleep(worker_setup.bootstrap_wait)
+        node_drain_counter.count(chunk_size)
+        remaining_seconds = deadline - time.time() if deadline else float("inf")
+        if stop_event.wait(max(0, min(worker_setup.bootstrap_wait, remaining_seconds))):
+            logger.info(f"Stop requested, interrupting draining for {manager.cluster}:{manager.pool}")
+            job_timer.stop()
+            return False
+        if remaining_seconds <= worker_setup.bootstrap_wait:
+            logger.warning(f"Ran out of time, interrupting draining for {manager.cluster}:{manager.pool}")
+            job_timer.stop()
+            return False
         if not _monitor_pool_health(
             manager=manager,
-            timeout=start_time + worker_setup.bootstrap_timeout,
+            timeout=min(start_time + worker_setup.bootstrap_timeout, deadline or float("inf")),
             drained=selection_chunk,
             health_check_interval_seconds=worker_setup.health_check_interval,
             ignore_pod_health=worker_setup.ignore_pod_health,
+            stop_event=stop_event,
         ):
             logger.warning(
                 f"Pool {manager.cluster}:{manager.pool} did not come back"
@@ -152,51 +298,107 @@ def _drain_node_selection(
             )
             job_timer.stop()
             return False
-        logger.info(f"Recycled {min(i + chunk, len(selected))} nodes out of {len(selected)} selected")
+        recycled_count += chunk_size
+        logger.info(f"Recycled {recycled_count} nodes out of {selection_size} selected")
     logger.info(f"Completed recycling node selection from {manager.cluster}:{manager.pool}")
     job_timer.stop()
     return True
 
 
+def _acquire_pool_lock(pool_lock: LockBase, timeout: float, stop_event: Optional[EventBase] = None) -> bool:
+    """Acquire pool lock, waiting for it in short slices to remain responsive to stop requests
+
+    :param LockBase pool_lock: lock to acquire
+    :param float timeout: max time to wait for the lock
+    :param Optional[EventBase] stop_event: if set while waiting, give up early
+    :return: true if the lock was acquired
+    """
+    if pool_lock.acquire(block=False):
+        return True
+    logger.info("Pool lock is held by another worker, waiting for it")
+    deadline = time.time() + timeout
+    while time.time() < deadline and not (stop_event and stop_event.is_set()):
+        if pool_lock.acquire(timeout=POOL_LOCK_WAIT_SLICE_SECONDS):
+            return True
+    return False
+
+
 def uptime_migration_worker(
-    cluster: str, pool: str, uptime_seconds: int, worker_setup: WorkerSetup, pool_lock: LockBase
+    cluster: str,
+    pool: str,
+    uptime_seconds: int,
+    worker_setup: WorkerSetup,
+    pool_lock: LockBase,
+    stop_event: Optional[EventBase] = None,
 ) -> None:
     """Worker monitoring and migrating nodes according to uptime
 
     :parma str cluster: cluster name
     :param str pool: pool name
-    :param int uptime_seconds: uptime threshold
+    :param int uptime_seconds: uptime threshold, counted from the k8s node creation time
     :param WorkerSetup worker_setup: migration setup
+    :param Optional[EventBase] stop_event: when set, the worker returns as soon as possible
     """
-    manager = PoolManager(cluster, pool, SUPPORTED_POOL_SCHEDULER)
-    node_selector = lambda node: node.instance.uptime.total_seconds() > uptime_seconds  # noqa
+    stop_event = stop_event or Event()
+    manager = PoolManager(cluster, pool, SUPPORTED_POOL_SCHEDULER, fetch_state=False)
     if not manager.draining_client:
         logger.warning(f"Draining client not set up for {cluster}:{pool}, giving up")
         return
-    while True:
-        if manager.is_capacity_satisfied():
-            with pool_lock:
-                _drain_node_selection(manager, node_selector, worker_setup)
-        else:
-            logger.warning(f"Pool {cluster}:{pool} is currently underprovisioned, skipping uptime migration iteration")
-        time.sleep(UPTIME_CHECK_INTERVAL_SECONDS)
-        manager.reload_state(load_pods_info=not worker_setup.ignore_pod_health)
+    connector = cast(KubernetesClusterConnector, manager.cluster_connector)
+    uptime_index = connector.build_node_uptime_index()
+    try:
+        while True:
+            # the index is fed by k8s watch events, so the pool only gets fully listed when something has to be done;
+            # uptime is counted from the k8s node creation time, rather than from the EC2 instance launch time
+            old_nodes = set(uptime_index.nodes_older_than(time.time() - uptime_seconds))
+            if old_nodes:
+                manager.reload_state(load_pods_info=not worker_setup.ignore_pod_health)
+                if manager.is_capacity_satisfied():
+                    node_selector = partial(_is_agent_in, frozenset(old_nodes))
+                    if _acquire_pool_lock(pool_lock, worker_setup.expected_duration, stop_event):
+                        try:
+                            _drain_node_selection(manager, node_selector, worker_setup, stop_event=stop_event)
+                        finally:
+                            pool_lock.release()
+                    else:
+                        logger.warning(
+                            f"Could not acquire lock for {cluster}:{pool}, skipping uptime migration iteration"
+                        )
+                else:
+                    logger.warning(
+                        f"Pool {cluster}:{pool} is currently underprovisioned, skipping uptime migration iteration"
+                    )
+            if stop_event.wait(UPTIME_CHECK_INTERVAL_SECONDS):
+                logger.info(f"Stop requested, exiting uptime migration worker for {cluster}:{pool}")
+                return
+    finally:
+        uptime_index.stop()
+        connector.stop_watching_pool_events()
 
 
-def event_migration_worker(migration_event: MigrationEvent, worker_setup: WorkerSetup, pool_lock: LockBase) -> None:
+def event_migration_worker(
+    migration_event: MigrationEvent,
+    worker_setup: WorkerSetup,
+    pool_lock: LockBase,
+    stop_event: Optional[EventBase] = None,
+) -> None:
     """Worker migrating nodes according to event configuration
 
     :param MigrationEvent migration_event: event instance
     :param WorkerSetup worker_setup: migration setup
+    :param Optional[EventBase] stop_event: when set, the worker returns as soon as possible
     """
     pool_lock_acquired = False
     manager = PoolManager(migration_event.cluster, migration_event.pool, SUPPORTED_POOL_SCHEDULER, fetch_state=False)
     connector = cast(KubernetesClusterConnector, manager.cluster_connector)
-    connector.set_label_selectors(migration_event.label_selectors, add_to_existing=True)
-    manager.reload_state(load_pods_info=not worker_setup.ignore_pod_health)
     try:
-        pool_lock.acquire(timeout=worker_setup.expected_duration)
+        if not _acquire_pool_lock(pool_lock, worker_setup.expected_duration, stop_event):
+            raise NodeMigrationError(f"Could not acquire lock for {migration_event.cluster}:{migration_event.pool}")
         pool_lock_acquired = True
+        # state is only loaded once holding the lock, as waiting for it may take a long time
+        connector.set_label_selectors(migration_event.label_selectors, add_to_existing=True)
+        # pods are not looked at until the pool health is monitored, which reloads the state by itself
+        manager.reload_state(load_pods_info=None)
         if worker_setup.disable_autoscaling:
             logger.info(f"Disabling autoscaling for {migration_event.cluster}:{migration_event.pool}")
             disable_autoscaling(
@@ -206,10 +408,10 @@ def event_migration_worker(migration_event: MigrationEvent, worker_setup: Worker
                 time.time() + worker_setup.expected_duration,
             )
         if worker_setup.prescaling:
-            nodes = manager.get_node_metadatas(AWS_RUNNING_STATES)
-            offset = worker_setup.prescaling.of(len(nodes))
+            weights = manager.get_node_weights_ndarray(AWS_RUNNING_STATES)
+            offset = worker_setup.prescaling.of(len(weights))
             logger.info(f"Applying pre-scaling of {offset} node to {migration_event.cluster}:{migration_event.pool}")
-            avg_weight = mean(node.instance.weight for node in nodes)
+            avg_weight = float(weights.mean())
             prescaled_capacity = round(manager.target_capacity + (offset * avg_weight))
             manager.modify_target_capacity(prescaled_capacity)
         if not _monitor_pool_health(
@@ -218,16 +420,18 @@ def event_migration_worker(migration_event: MigrationEvent, worker_setup: Worker
             drained=[],
             health_check_interval_seconds=worker_setup.health_check_interval,
             ignore_pod_health=True,
+            stop_event=stop_event,
         ):
             raise NodeMigrationError(f"Pool {migration_event.cluster}:{migration_event.pool} is not healthy")
         node_selector = lambda node: node.agent.agent_id and not migration_event.condition.matches(node)  # noqa
-        migration_routine = partial(_drain_node_selection, manager, node_selector, worker_setup)
-        if not limit_function_runtime(migration_routine, worker_setup.expected_duration):
+        deadline = time.time() + worker_setup.expected_duration
+        if not _drain_node_selection(manager, node_selector, worker_setup, stop_event=stop_event, deadline=deadline):
             raise NodeMigrationError(f"Failed migrating nodes for event {migration_event}")
     except Exception as e:
         logger.error(f"Issue while processing migration event {migration_event}: {e}")
         raise
     finally:
+        connector.stop_watching_pool_events()
         if pool_lock_acquired:
             pool_lock.release()
         # we do not reset the pool target capacity in case of pre-scaling as we
@@ -90,8 +90,8 @@ class LogCounter(CounterProtocol):
         self.name = name
         self.counter = 0
 
-    def count(self, *args: Any, **kwargs: Any) -> None:
-        self.counter += 1
+    def count(self, value: int = 1, *args: Any, **kwargs: Any) -> None:
+        self.counter += value
         logger.debug(f"counter {self.name} incremented to {self.counter}")
 
 
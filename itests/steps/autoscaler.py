@@ -285,14 +285,6 @@ def create_k8s_autoscaler(context, prevent_scale_down_after_capacity_loss=False)
     )
     context.mock_cluster_connector._unschedulable_pods = []
     if float(context.pending_cpus) > 0:
-        context.mock_cluster_connector.get_unschedulable_pods = (
-            lambda: KubernetesClusterConnector.get_unschedulable_pods(context.mock_cluster_connector)  # noqa
-        )
-        context.mock_cluster_connector._get_pod_unschedulable_reason.side_effect = lambda pod: (
-            PodUnschedulableReason.InsufficientResources
-            if pod.metadata.name == "pod1"
-            else PodUnschedulableReason.Unknown
-        )
         context.mock_cluster_connector._unschedulable_pods = [
             V1Pod(
                 metadata=V1ObjectMeta(name="pod1"),
@@ -325,6 +317,11 @@ def create_k8s_autoscaler(context, prevent_scale_down_after_capacity_loss=False)
                 ),
             ),
         ]
+        pod1, pod2 = context.mock_cluster_connector._unschedulable_pods
+        context.mock_cluster_connector.get_unschedulable_pods.return_value = [
+            (pod1, PodUnschedulableReason.InsufficientResources),
+            (pod2, PodUnschedulableReason.Unknown),
+        ]
 
     context.autoscaler = Autoscaler(
         cluster="kube-test",
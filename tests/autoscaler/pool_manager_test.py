@@ -232,6 +232,15 @@ class TestPruneExcessFulfilledCapacity:
                     termination_reason=TerminationReason.SCALING_DOWN,
                 ),
             ]
+            assert mock_pool_manager.draining_client.flush.call_count == 1
+
+    def test_submission_failure(self, mock_pool_manager):
+        mock_pool_manager.draining_enabled = True
+        mock_pool_manager.draining_client.submit_instance_for_draining.side_effect = [None, ValueError]
+        with pytest.raises(ValueError):
+            mock_pool_manager.prune_excess_fulfilled_capacity(100)
+        # submissions which went through are still sent out
+        assert mock_pool_manager.draining_client.flush.call_count == 1
 
     def test_terminate_immediately(self, mock_pool_manager):
         mock_pool_manager.prune_excess_fulfilled_capacity(100)
@@ -630,3 +639,25 @@ def test_get_expired_orphan_instances(mock_pool_manager):
     result = mock_pool_manager.get_expired_orphan_instances(1800)
 
     assert result == {"sfr-0": ["i-0"], "sfr-1": ["i-3"]}
+
+
+def test_get_node_weights_ndarray(mock_pool_manager):
+    mock_pool_manager.get_node_metadatas = mock.Mock(
+        return_value=[_make_metadata("sfr-0", f"i-{i}", weight=i + 1) for i in range(3)],
+    )
+    weights = mock_pool_manager.get_node_weights_ndarray(("running",))
+    mock_pool_manager.get_node_metadatas.assert_called_once_with(("running",))
+    assert weights.tolist() == [1.0, 2.0, 3.0]
+    assert weights.mean() == 2.0
+
+
+def test_get_node_metadatas_cached(mock_pool_manager):
+    for group in mock_pool_manager.resource_groups.values():
+        group.get_instance_metadatas.return_value = [_make_metadata(group.id, f"i-{group.id}").instance]
+    nodes = mock_pool_manager.get_node_metadatas(("running",))
+    assert len(nodes) == 7
+    assert mock_pool_manager.get_node_metadatas(["running"]) is nodes
+    assert mock_pool_manager.resource_groups["sfr-0"].get_instance_metadatas.call_count == 1
+    mock_pool_manager.invalidate_node_metadatas()
+    assert mock_pool_manager.get_node_metadatas(("running",)) == nodes
+    assert mock_pool_manager.resource_groups["sfr-0"].get_instance_metadatas.call_count == 2
@@ -19,6 +19,7 @@ import pytest
 
 from clusterman.aws.client import ec2_describe_instances
 from clusterman.aws.client import MAX_PAGE_SIZE
+from clusterman.aws.client import sqs
 
 
 def test_empty_instance_ids():
@@ -37,3 +38,7 @@ def test_over_filter_limits(value_numbers):
             call(InstanceIds=instance_ids[i * MAX_PAGE_SIZE : (i + 1) * MAX_PAGE_SIZE])
             for i in range(target_call_count)
         ]
+
+
+def test_sqs_client_pool_size():
+    assert sqs.client_config.max_pool_connections == 50
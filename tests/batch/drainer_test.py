@@ -26,6 +26,7 @@ class LoopBreak(Exception):
 def test_drainer_batch_process_queues():
     batch = NodeDrainerBatch()
     batch.run_interval = 5
+    batch.receive_wait_seconds = 1
     batch.logger = mock.MagicMock()
     batch.options = mock.MagicMock(cluster="westeros-prod", autorestart_interval_minutes=0)
     with mock.patch(
@@ -47,12 +48,13 @@ def test_drainer_batch_process_queues():
         autospec=True,
     ):
 
-        mock_draining_client.return_value.process_termination_queue.return_value = False
-        mock_draining_client.return_value.process_drain_queue.return_value = False
+        mock_draining_client.return_value.process_termination_queue_concurrently.return_value = False
+        mock_draining_client.return_value.process_drain_queue_concurrently.return_value = False
         mock_draining_client.return_value.process_warning_queue.return_value = False
         with pytest.raises(LoopBreak):
             batch.run()
-        assert mock_draining_client.return_value.process_termination_queue.called
-        assert mock_draining_client.return_value.process_drain_queue.called
+        mock_draining_client.assert_called_once_with("westeros-prod", receive_wait_seconds=1)
+        assert mock_draining_client.return_value.process_termination_queue_concurrently.called
+        assert mock_draining_client.return_value.process_drain_queue_concurrently.called
         assert mock_draining_client.return_value.clean_processing_hosts_cache.called
         assert mock_draining_client.return_value.process_warning_queue.called
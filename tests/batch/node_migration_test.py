@@ -115,15 +115,19 @@ def test_get_worker_setup(migration_batch):
     )
 
 
+@patch("clusterman.batch.node_migration.Event")
 @patch("clusterman.batch.node_migration.RestartableDaemonProcess")
-def test_spawn_worker(mock_process, migration_batch):
+def test_spawn_worker(mock_process, mock_event, migration_batch):
     mock_lock = MagicMock()
     mock_routine = MagicMock()
     worker_label = "foobar:123:456"
     migration_batch.worker_locks = defaultdict(mock_lock)
     assert migration_batch._spawn_worker(worker_label, mock_routine, 1, x=2) is True
     mock_process.assert_called_once_with(
-        target=mock_routine, args=(1,), kwargs={"x": 2, "pool_lock": mock_lock.return_value}
+        target=mock_routine,
+        args=(1,),
+        kwargs={"x": 2, "pool_lock": mock_lock.return_value, "stop_event": mock_event.return_value},
+        stop_event=mock_event.return_value,
     )
     assert migration_batch.migration_workers == {worker_label: mock_process.return_value}
 
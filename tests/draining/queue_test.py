@@ -11,59 +11,126 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
 import socket
+import threading
+import time
+from contextlib import contextmanager
 from unittest import mock
 
 import arrow
+import cachetools
 import pytest
 from botocore.exceptions import ClientError
 
 from clusterman.aws.spot_fleet_resource_group import SpotFleetResourceGroup
+from clusterman.draining.queue import _dumps
+from clusterman.draining.queue import _hostname_ip
+from clusterman.draining.queue import _instance_details_cache
+from clusterman.draining.queue import _loads
+from clusterman.draining.queue import _sender_message_attributes
 from clusterman.draining.queue import DrainingClient
 from clusterman.draining.queue import Host
 from clusterman.draining.queue import host_from_instance_id
+from clusterman.draining.queue import INSTANCE_DETAILS_CACHE_SECONDS
+from clusterman.draining.queue import REASON_NODE_MIGRATION
+from clusterman.draining.queue import REASON_SCALING_DOWN
+from clusterman.draining.queue import REASON_SPOT_INTERRUPTION
 from clusterman.draining.queue import terminate_host
+from clusterman.draining.queue import terminate_hosts
 from clusterman.draining.queue import TerminationReason
+from clusterman.exceptions import DrainingSubmissionError
+
+# fixed point in time, so tests don't need to get or parse the current time over and over
+FROZEN_NOW = arrow.Arrow(2023, 1, 1)
+SFR_TAG = ("aws:ec2spot:fleet-request-id", "sfr-123")
+AGENT_ADDRESSES = {"PrivateIpAddress": "10.1.1.1", "PrivateDnsName": "agt123"}
+
+
+@pytest.fixture(autouse=True)
+def freeze_now():
+    # only the arrow name seen by the queue module is replaced, so the clock isn't frozen for other modules
+    with mock.patch("clusterman.draining.queue.arrow", wraps=arrow) as mock_arrow:
+        mock_arrow.now.return_value = FROZEN_NOW
+        yield mock_arrow
+
+
+@pytest.fixture(autouse=True)
+def clear_instance_details_cache():
+    _instance_details_cache.clear()
+
+
+@pytest.fixture(scope="module")
+def mock_sqs():
+    # autospec-ing the client is the expensive part, so it is only done once for the module;
+    # sqs is only used through class attributes, so the instance spec is enough
+    with mock.patch("clusterman.draining.queue.sqs", autospec=True, instance=True) as mock_sqs:
+        yield mock_sqs
+
+
+@pytest.fixture(scope="module")
+def autospec_cache():
+    return {}
 
 
 @pytest.fixture
-def mock_draining_client():
-    with mock.patch("clusterman.draining.queue.sqs", autospec=True) as mock_sqs:
-        mock_sqs.send_message = mock.Mock()
-        mock_sqs.receive_message = mock.Mock()
-        mock_sqs.delete_message = mock.Mock()
-        return DrainingClient("mesos-test")
+def patch_autospec(autospec_cache):
+    """Patch targets with autospec'd mocks, which are built once per module and reset after each test"""
+    patchers = []
+
+    def _patch(target):
+        cached_mock = autospec_cache.get(target)
+        patcher = mock.patch(target, new=cached_mock) if cached_mock else mock.patch(target, autospec=True)
+        patchers.append(patcher)
+        autospec_cache[target] = patcher.start()
+        return autospec_cache[target]
+
+    yield _patch
+    for patcher in reversed(patchers):
+        patcher.stop()
+    for cached_mock in autospec_cache.values():
+        cached_mock.reset_mock()
+        cached_mock.return_value = mock.DEFAULT
+        cached_mock.side_effect = None
+
+
+@pytest.fixture
+def mock_draining_client(mock_sqs):
+    # the client itself is cheap to build but holds send/receive buffers and the processing cache,
+    # so it stays per-test on top of the module-wide sqs mock
+    mock_sqs.send_message = mock.Mock()
+    mock_sqs.send_message_batch = mock.Mock(return_value={"Successful": [], "Failed": []})
+    mock_sqs.receive_message = mock.Mock()
+    mock_sqs.delete_message = mock.Mock()
+    mock_sqs.delete_message_batch = mock.Mock(return_value={"Successful": [], "Failed": []})
+    mock_sqs.change_message_visibility_batch = mock.Mock(return_value={"Successful": [], "Failed": []})
+    return DrainingClient("mesos-test")
 
 
 def test_submit_instance_for_draining(mock_draining_client):
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.json",
-        autospec=True,
-    ) as mock_json:
+    with mock.patch("clusterman.draining.queue._dumps", new=mock.Mock(return_value="BODY")) as mock_dumps:
         mock_instance = mock.Mock(
             group_id="sfr123",
             hostname="host123",
             instance_id="i123",
             ip_address="10.1.1.1",
         )
-        assert (
-            mock_draining_client.submit_instance_for_draining(
-                mock_instance,
-                sender=SpotFleetResourceGroup,
-                scheduler="mesos",
-                pool="default",
-                agent_id="agt123",
-                draining_start_time=now,
-                termination_reason=TerminationReason.SCALING_DOWN,
-            )
-            == mock_draining_client.client.send_message.return_value
+        mock_draining_client.submit_instance_for_draining(
+            mock_instance,
+            sender=SpotFleetResourceGroup,
+            scheduler="mesos",
+            pool="default",
+            agent_id="agt123",
+            draining_start_time=FROZEN_NOW,
+            termination_reason=TerminationReason.SCALING_DOWN,
         )
-        mock_json.dumps.assert_called_with(
+        assert mock_draining_client.client.send_message_batch.call_count == 0
+        mock_draining_client.flush()
+        mock_dumps.assert_called_with(
             {
                 "agent_id": "agt123",
                 "attempt": 1,
-                "draining_start_time": now.for_json(),
+                "draining_start_time": FROZEN_NOW.for_json(),
                 "group_id": "sfr123",
                 "hostname": "host123",
                 "instance_id": "i123",
@@ -73,24 +140,25 @@ def test_submit_instance_for_draining(mock_draining_client):
                 "scheduler": "mesos",
             }
         )
-        mock_draining_client.client.send_message.assert_called_with(
+        mock_draining_client.client.send_message_batch.assert_called_once_with(
             QueueUrl=mock_draining_client.drain_queue_url,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": "sfr",
+            Entries=[
+                {
+                    "Id": "0",
+                    "MessageAttributes": {
+                        "Sender": {
+                            "DataType": "String",
+                            "StringValue": "sfr",
+                        },
+                    },
+                    "MessageBody": mock_dumps.return_value,
                 },
-            },
-            MessageBody=mock_json.dumps.return_value,
+            ],
         )
 
 
 def test_submit_host_for_draining(mock_draining_client):
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.json",
-        autospec=True,
-    ) as mock_json:
+    with mock.patch("clusterman.draining.queue._dumps", new=mock.Mock(return_value="BODY")) as mock_dumps:
         mock_host = mock.Mock(
             instance_id="i123",
             ip="10.1.1.1",
@@ -100,18 +168,16 @@ def test_submit_host_for_draining(mock_draining_client):
             scheduler="kubernetes",
             agent_id="agt123",
             pool="default",
-            draining_start_time=now.for_json(),
+            draining_start_time=FROZEN_NOW.for_json(),
             termination_reason=TerminationReason.SCALING_DOWN.value,
         )
-        assert (
-            mock_draining_client.submit_host_for_draining(
-                mock_host,
-                0,
-                5,
-            )
-            == mock_draining_client.client.send_message.return_value
+        mock_draining_client.submit_host_for_draining(
+            mock_host,
+            0,
+            5,
         )
-        mock_json.dumps.assert_called_with(
+        mock_draining_client.flush()
+        mock_dumps.assert_called_with(
             {
                 "instance_id": "i123",
                 "ip": "10.1.1.1",
@@ -121,23 +187,121 @@ def test_submit_host_for_draining(mock_draining_client):
                 "agent_id": "agt123",
                 "attempt": 5,
                 "pool": "default",
-                "draining_start_time": now.for_json(),
+                "draining_start_time": FROZEN_NOW.for_json(),
                 "termination_reason": TerminationReason.SCALING_DOWN.value,
             }
         )
-        mock_draining_client.client.send_message.assert_called_with(
+        mock_draining_client.client.send_message_batch.assert_called_once_with(
             QueueUrl=mock_draining_client.drain_queue_url,
-            DelaySeconds=0,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": "aws_2_min_warning",
+            Entries=[
+                {
+                    "Id": "0",
+                    "DelaySeconds": 0,
+                    "MessageAttributes": {
+                        "Sender": {
+                            "DataType": "String",
+                            "StringValue": "aws_2_min_warning",
+                        },
+                    },
+                    "MessageBody": mock_dumps.return_value,
                 },
-            },
-            MessageBody=mock_json.dumps.return_value,
+            ],
         )
 
 
+def test_submit_host_for_draining_full_batch(mock_draining_client):
+    mock_host = Host(
+        instance_id="i123",
+        hostname="host123",
+        group_id="sfr123",
+        ip="10.1.1.1",
+        sender="clusterman",
+        receipt_handle="rcpt",
+    )
+    for _ in range(11):
+        mock_draining_client.submit_host_for_draining(mock_host)
+    # a full batch is sent right away, the rest waits for flushing
+    assert mock_draining_client.client.send_message_batch.call_count == 1
+    assert len(mock_draining_client.client.send_message_batch.call_args[1]["Entries"]) == 10
+    mock_draining_client.flush()
+    assert mock_draining_client.client.send_message_batch.call_count == 2
+    assert len(mock_draining_client.client.send_message_batch.call_args[1]["Entries"]) == 1
+    mock_draining_client.flush()
+    assert mock_draining_client.client.send_message_batch.call_count == 2
+
+
+def test_flush_failed_messages(mock_draining_client):
+    mock_host = Host(
+        instance_id="i123",
+        hostname="host123",
+        group_id="sfr123",
+        ip="10.1.1.1",
+        sender="clusterman",
+        receipt_handle="rcpt",
+    )
+    mock_draining_client.submit_host_for_draining(mock_host)
+    mock_draining_client.client.send_message_batch.return_value = {"Successful": [], "Failed": [{"Id": "0"}]}
+    with pytest.raises(DrainingSubmissionError):
+        mock_draining_client.flush()
+
+
+def test_payload_key_order(mock_draining_client):
+    host = Host(instance_id="i123", hostname="host123", group_id="sfr123", ip="10.1.1.1", sender="", receipt_handle="")
+    with mock.patch("clusterman.draining.queue._dumps", new=mock.Mock(return_value="")) as mock_dumps:
+        mock_draining_client.submit_instance_for_draining(
+            mock.Mock(),
+            sender=SpotFleetResourceGroup,
+            scheduler="mesos",
+            pool="default",
+            agent_id="agt123",
+            draining_start_time=FROZEN_NOW,
+            termination_reason=TerminationReason.SCALING_DOWN,
+        )
+        mock_draining_client.submit_host_for_draining(host)
+        mock_draining_client.submit_host_for_termination(host, delay=0)
+    for payload_call in mock_dumps.call_args_list:
+        payload = payload_call[0][0]
+        assert list(payload.keys()) == sorted(payload.keys())
+
+
+def test_reason_constants_match_enum():
+    assert REASON_SCALING_DOWN == TerminationReason.SCALING_DOWN.value
+    assert REASON_SPOT_INTERRUPTION == TerminationReason.SPOT_INTERRUPTION.value
+    assert REASON_NODE_MIGRATION == TerminationReason.NODE_MIGRATION.value
+
+
+def test_host_is_slotted():
+    host = Host(instance_id="i123", hostname="host123", group_id="sfr123", ip="10.1.1.1", sender="", receipt_handle="")
+    assert not hasattr(host, "__dict__")
+    assert hash(host) == hash(host._replace())
+
+
+def test_message_body_round_trip():
+    payload = {"instance_id": "i123", "attempt": 2, "pool": "default"}
+    body = _dumps(payload)
+    assert isinstance(body, str)
+    assert _loads(body) == payload
+
+
+@mock.patch("clusterman.draining.queue.orjson", new=None)
+def test_message_body_round_trip_json_fallback():
+    payload = {"instance_id": "i123", "attempt": 2, "pool": "default"}
+    body = _dumps(payload)
+    assert body == json.dumps(payload)
+    assert _loads(body) == payload
+
+
+def test_hostname_ip():
+    host = Host(instance_id="i123", hostname="host123", group_id="sfr123", ip="10.1.1.1", sender="", receipt_handle="")
+    assert _hostname_ip(host) == "host123|10.1.1.1"
+
+
+def test_sender_message_attributes_is_memoized():
+    assert _sender_message_attributes("sfr") is _sender_message_attributes("sfr")
+    assert _sender_message_attributes("sfr") == {"Sender": {"DataType": "String", "StringValue": "sfr"}}
+    assert _sender_message_attributes("asg") != _sender_message_attributes("sfr")
+
+
 def test_get_warned_host(mock_draining_client):
     with mock.patch(
         "clusterman.draining.queue.host_from_instance_id",
@@ -171,11 +335,7 @@ def test_get_warned_host_no_warning_queue_url(mock_draining_client):
 
 
 def test_submit_host_for_termination(mock_draining_client):
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.json",
-        autospec=True,
-    ) as mock_json:
+    with mock.patch("clusterman.draining.queue._dumps", new=mock.Mock(return_value="BODY")) as mock_dumps:
         mock_host = mock.Mock(
             instance_id="i123",
             ip="10.1.1.1",
@@ -185,20 +345,18 @@ def test_submit_host_for_termination(mock_draining_client):
             scheduler="kubernetes",
             agent_id="agt123",
             pool="default",
-            draining_start_time=now.for_json(),
+            draining_start_time=FROZEN_NOW.for_json(),
             termination_reason=TerminationReason.SCALING_DOWN.value,
         )
-        assert (
-            mock_draining_client.submit_host_for_termination(
-                mock_host,
-                delay=0,
-            )
-            == mock_draining_client.client.send_message.return_value
+        mock_draining_client.submit_host_for_termination(
+            mock_host,
+            delay=0,
         )
-        mock_json.dumps.assert_called_with(
+        mock_draining_client.flush()
+        mock_dumps.assert_called_with(
             {
                 "agent_id": "agt123",
-                "draining_start_time": now.for_json(),
+                "draining_start_time": FROZEN_NOW.for_json(),
                 "group_id": "sfr123",
                 "hostname": "host123",
                 "instance_id": "i123",
@@ -208,28 +366,31 @@ def test_submit_host_for_termination(mock_draining_client):
                 "termination_reason": TerminationReason.SCALING_DOWN.value,
             }
         )
-        mock_draining_client.client.send_message.assert_called_with(
+        mock_draining_client.client.send_message_batch.assert_called_with(
             QueueUrl=mock_draining_client.termination_queue_url,
-            DelaySeconds=0,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": "clusterman",
+            Entries=[
+                {
+                    "Id": "0",
+                    "DelaySeconds": 0,
+                    "MessageAttributes": {
+                        "Sender": {
+                            "DataType": "String",
+                            "StringValue": "clusterman",
+                        },
+                    },
+                    "MessageBody": mock_dumps.return_value,
                 },
-            },
-            MessageBody=mock_json.dumps.return_value,
+            ],
         )
 
-        assert (
-            mock_draining_client.submit_host_for_termination(
-                mock_host,
-            )
-            == mock_draining_client.client.send_message.return_value
+        mock_draining_client.submit_host_for_termination(
+            mock_host,
         )
-        mock_json.dumps.assert_called_with(
+        mock_draining_client.flush()
+        mock_dumps.assert_called_with(
             {
                 "agent_id": "agt123",
-                "draining_start_time": now.for_json(),
+                "draining_start_time": FROZEN_NOW.for_json(),
                 "group_id": "sfr123",
                 "hostname": "host123",
                 "instance_id": "i123",
@@ -239,25 +400,26 @@ def test_submit_host_for_termination(mock_draining_client):
                 "termination_reason": TerminationReason.SCALING_DOWN.value,
             }
         )
-        mock_draining_client.client.send_message.assert_called_with(
+        mock_draining_client.client.send_message_batch.assert_called_with(
             QueueUrl=mock_draining_client.termination_queue_url,
-            DelaySeconds=90,
-            MessageAttributes={
-                "Sender": {
-                    "DataType": "String",
-                    "StringValue": "clusterman",
+            Entries=[
+                {
+                    "Id": "0",
+                    "DelaySeconds": 90,
+                    "MessageAttributes": {
+                        "Sender": {
+                            "DataType": "String",
+                            "StringValue": "clusterman",
+                        },
+                    },
+                    "MessageBody": mock_dumps.return_value,
                 },
-            },
-            MessageBody=mock_json.dumps.return_value,
+            ],
         )
 
 
 def test_get_host_to_drain(mock_draining_client):
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.json",
-        autospec=True,
-    ) as mock_json:
+    with mock.patch("clusterman.draining.queue._loads", new=mock.Mock(return_value=None)) as mock_loads:
         mock_draining_client.client.receive_message.return_value = {"Messages": []}
         assert mock_draining_client.get_host_to_drain() is None
         mock_draining_client.client.receive_message.return_value = {
@@ -269,14 +431,14 @@ def test_get_host_to_drain(mock_draining_client):
                 }
             ]
         }
-        mock_json.loads.return_value = {
+        mock_loads.return_value = {
             "instance_id": "i123",
             "ip": "10.1.1.1",
             "hostname": "host123",
             "group_id": "sfr123",
             "pool": "default",
             "agent_id": "agt123",
-            "draining_start_time": now.for_json(),
+            "draining_start_time": FROZEN_NOW.for_json(),
         }
 
         assert mock_draining_client.get_host_to_drain() == Host(
@@ -288,22 +450,69 @@ def test_get_host_to_drain(mock_draining_client):
             group_id="sfr123",
             agent_id="agt123",
             pool="default",
-            draining_start_time=now.for_json(),
+            draining_start_time=FROZEN_NOW.for_json(),
         )
-        mock_json.loads.assert_called_with("Helloworld")
+        mock_loads.assert_called_with("Helloworld")
         mock_draining_client.client.receive_message.assert_called_with(
             QueueUrl=mock_draining_client.drain_queue_url,
             MessageAttributeNames=["Sender"],
             MaxNumberOfMessages=1,
+            WaitTimeSeconds=20,
         )
 
 
+def test_get_host_to_drain_buffered(mock_draining_client):
+    mock_draining_client.client.receive_message.return_value = {
+        "Messages": [
+            {
+                "MessageAttributes": {"Sender": {"StringValue": "clusterman"}},
+                "ReceiptHandle": f"receipt_{i}",
+                "Body": f'{{"instance_id": "i{i}", "ip": "10.1.1.{i}", "hostname": "host{i}", "group_id": "sfr123"}}',
+            }
+            for i in range(3)
+        ]
+    }
+    hosts = [mock_draining_client.get_host_to_drain(max_messages=3) for _ in range(3)]
+    assert [host.receipt_handle for host in hosts] == ["receipt_0", "receipt_1", "receipt_2"]
+    assert mock_draining_client.client.receive_message.call_count == 1
+    mock_draining_client.client.receive_message.return_value = {"Messages": []}
+    assert mock_draining_client.get_host_to_drain() is None
+    assert mock_draining_client.client.receive_message.call_count == 2
+
+
+def test_get_host_to_drain_buffered_past_visibility_timeout(mock_draining_client):
+    mock_draining_client.client.receive_message.return_value = {
+        "Messages": [
+            {
+                "MessageAttributes": {"Sender": {"StringValue": "clusterman"}},
+                "ReceiptHandle": f"receipt_{i}",
+                "Body": f'{{"instance_id": "i{i}", "ip": "10.1.1.{i}", "hostname": "host{i}", "group_id": "sfr123"}}',
+            }
+            for i in range(3)
+        ]
+    }
+    with mock.patch("clusterman.draining.queue.time.monotonic", return_value=100.0) as mock_monotonic:
+        assert mock_draining_client.get_host_to_drain(max_messages=3).receipt_handle == "receipt_0"
+        assert mock_draining_client.get_host_to_drain(buffered_only=True).receipt_handle == "receipt_1"
+        # SQS makes the last message visible again, so the buffered copy is not handed out anymore
+        mock_monotonic.return_value = 100.0 + mock_draining_client.visibility_timeout_seconds
+        assert mock_draining_client.get_host_to_drain(buffered_only=True) is None
+    assert mock_draining_client.client.receive_message.call_count == 1
+
+
+def test_get_host_to_drain_empty_queue(mock_draining_client):
+    mock_draining_client.client.receive_message.return_value = {"Messages": []}
+    assert mock_draining_client.get_host_to_drain() is None
+    mock_draining_client.client.receive_message.assert_called_once_with(
+        QueueUrl=mock_draining_client.drain_queue_url,
+        MessageAttributeNames=["Sender"],
+        MaxNumberOfMessages=1,
+        WaitTimeSeconds=20,
+    )
+
+
 def test_get_host_to_terminate(mock_draining_client):
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.json",
-        autospec=True,
-    ) as mock_json:
+    with mock.patch("clusterman.draining.queue._loads", new=mock.Mock(return_value=None)) as mock_loads:
         mock_draining_client.client.receive_message.return_value = {"Messages": []}
         assert mock_draining_client.get_host_to_terminate() is None
         mock_draining_client.client.receive_message.return_value = {
@@ -315,14 +524,14 @@ def test_get_host_to_terminate(mock_draining_client):
                 }
             ]
         }
-        mock_json.loads.return_value = {
+        mock_loads.return_value = {
             "instance_id": "i123",
             "ip": "10.1.1.1",
             "hostname": "host123",
             "group_id": "sfr123",
             "pool": "default",
             "agent_id": "agt123",
-            "draining_start_time": now.for_json(),
+            "draining_start_time": FROZEN_NOW.for_json(),
         }
 
         assert mock_draining_client.get_host_to_terminate() == Host(
@@ -334,32 +543,30 @@ def test_get_host_to_terminate(mock_draining_client):
             group_id="sfr123",
             agent_id="agt123",
             pool="default",
-            draining_start_time=now.for_json(),
+            draining_start_time=FROZEN_NOW.for_json(),
         )
-        mock_json.loads.assert_called_with("Helloworld")
+        mock_loads.assert_called_with("Helloworld")
         mock_draining_client.client.receive_message.assert_called_with(
             QueueUrl=mock_draining_client.termination_queue_url,
             MessageAttributeNames=["Sender"],
             MaxNumberOfMessages=1,
+            WaitTimeSeconds=20,
         )
 
 
 def test_delete_drain_message(mock_draining_client):
-    mock_hosts = [
-        mock.Mock(receipt_handle=1),
-        mock.Mock(receipt_handle=2),
-    ]
+    mock_hosts = [mock.Mock(receipt_handle=i) for i in range(12)]
 
     mock_draining_client.delete_drain_messages(mock_hosts)
-    mock_draining_client.client.delete_message.assert_has_calls(
+    mock_draining_client.client.delete_message_batch.assert_has_calls(
         [
             mock.call(
                 QueueUrl=mock_draining_client.drain_queue_url,
-                ReceiptHandle=1,
+                Entries=[{"Id": str(i), "ReceiptHandle": i} for i in range(10)],
             ),
             mock.call(
                 QueueUrl=mock_draining_client.drain_queue_url,
-                ReceiptHandle=2,
+                Entries=[{"Id": "0", "ReceiptHandle": 10}, {"Id": "1", "ReceiptHandle": 11}],
             ),
         ]
     )
@@ -372,24 +579,16 @@ def test_delete_warning_message(mock_draining_client):
     ]
 
     mock_draining_client.delete_warning_messages(mock_hosts)
-    mock_draining_client.client.delete_message.assert_has_calls(
-        [
-            mock.call(
-                QueueUrl=mock_draining_client.warning_queue_url,
-                ReceiptHandle=1,
-            ),
-            mock.call(
-                QueueUrl=mock_draining_client.warning_queue_url,
-                ReceiptHandle=2,
-            ),
-        ]
+    mock_draining_client.client.delete_message_batch.assert_called_once_with(
+        QueueUrl=mock_draining_client.warning_queue_url,
+        Entries=[{"Id": "0", "ReceiptHandle": 1}, {"Id": "1", "ReceiptHandle": 2}],
     )
 
 
 def test_delete_warning_message_no_warning_queue_url(mock_draining_client):
     mock_draining_client.warning_queue_url = None
     mock_draining_client.delete_warning_messages(["host"])
-    assert mock_draining_client.client.delete_message.call_count == 0
+    assert mock_draining_client.client.delete_message_batch.call_count == 0
 
 
 def test_delete_terminate_message(mock_draining_client):
@@ -399,22 +598,14 @@ def test_delete_terminate_message(mock_draining_client):
     ]
 
     mock_draining_client.delete_terminate_messages(mock_hosts)
-    mock_draining_client.client.delete_message.assert_has_calls(
-        [
-            mock.call(
-                QueueUrl=mock_draining_client.termination_queue_url,
-                ReceiptHandle=1,
-            ),
-            mock.call(
-                QueueUrl=mock_draining_client.termination_queue_url,
-                ReceiptHandle=2,
-            ),
-        ]
+    mock_draining_client.client.delete_message_batch.assert_called_once_with(
+        QueueUrl=mock_draining_client.termination_queue_url,
+        Entries=[{"Id": "0", "ReceiptHandle": 1}, {"Id": "1", "ReceiptHandle": 2}],
     )
 
 
 def test_process_termination_queue(mock_draining_client):
-    with mock.patch("clusterman.draining.queue.terminate_host", autospec=True,) as mock_terminate, mock.patch(
+    with mock.patch("clusterman.draining.queue.terminate_hosts") as mock_terminate, mock.patch(
         "clusterman.draining.queue.down",
         autospec=True,
     ) as mock_down, mock.patch("clusterman.draining.queue.up", autospec=True,) as mock_up, mock.patch(
@@ -427,414 +618,517 @@ def test_process_termination_queue(mock_draining_client):
         mock_mesos_client = mock.Mock()
         mock_kubernetes_client = mock.Mock()
         mock_get_host_to_terminate.return_value = None
-        mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client)
+        assert mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client) is False
         assert mock_draining_client.get_host_to_terminate.called
         assert not mock_terminate.called
         assert not mock_delete_terminate_messages.called
 
         mock_host = mock.Mock(hostname="", instance_id="i123")
-        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = arrow.now()
-        mock_get_host_to_terminate.return_value = mock_host
-        mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_terminate.called
-        mock_terminate.assert_called_with(mock_host)
+        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = time.monotonic()
+        mock_get_host_to_terminate.side_effect = [mock_host, None]
+        assert mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client) is True
+        mock_get_host_to_terminate.assert_called_with(mock_draining_client, buffered_only=True)
+        mock_terminate.assert_called_with([mock_host])
         assert not mock_down.called
         assert not mock_up.called
         mock_delete_terminate_messages.assert_called_with(mock_draining_client, [mock_host])
 
         mock_host = mock.Mock(hostname="host1", ip="10.1.1.1", instance_id="i123", scheduler="mesos")
-        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = arrow.now()
-        mock_get_host_to_terminate.return_value = mock_host
+        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = time.monotonic()
+        mock_get_host_to_terminate.side_effect = [mock_host, None]
         mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_terminate.called
-        mock_terminate.assert_called_with(mock_host)
+        mock_terminate.assert_called_with([mock_host])
         mock_down.assert_called_with(mock_mesos_client, ["host1|10.1.1.1"])
         mock_up.assert_called_with(mock_mesos_client, ["host1|10.1.1.1"])
         mock_delete_terminate_messages.assert_called_with(mock_draining_client, [mock_host])
 
         mock_host = mock.Mock(hostname="", ip="10.1.1.1", instance_id="i123", scheduler="kubernetes")
-        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = arrow.now()
-        mock_get_host_to_terminate.return_value = mock_host
+        mock_draining_client.draining_host_ttl_cache[mock_host.instance_id] = time.monotonic()
+        mock_get_host_to_terminate.side_effect = [mock_host, None]
         mock_draining_client.process_termination_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_terminate.called
-        mock_terminate.assert_called_with(mock_host)
+        mock_terminate.assert_called_with([mock_host])
         mock_delete_terminate_messages.assert_called_with(mock_draining_client, [mock_host])
 
 
-def test_process_drain_queue(mock_draining_client):
-    now = arrow.now()
-    with mock.patch("clusterman.draining.queue.mesos_drain", autospec=True,) as mock_mesos_drain, mock.patch(
-        "clusterman.draining.queue.k8s_drain",
-        autospec=True,
-    ) as mock_k8s_drain, mock.patch(
-        "clusterman.draining.queue.k8s_uncordon",
-        autospec=True,
-    ) as mock_k8s_uncordon, mock.patch(
-        "clusterman.draining.queue.DrainingClient.get_host_to_drain",
-        autospec=True,
-    ) as mock_get_host_to_drain, mock.patch(
-        "clusterman.draining.queue.DrainingClient.delete_drain_messages",
-        autospec=True,
-    ) as mock_delete_drain_messages, mock.patch(
-        "clusterman.draining.queue.DrainingClient.submit_host_for_termination",
+def test_process_termination_queue_batch(mock_draining_client):
+    with mock.patch("clusterman.draining.queue.terminate_hosts") as mock_terminate, mock.patch(
+        "clusterman.draining.queue.down",
         autospec=True,
-    ) as mock_submit_host_for_termination, mock.patch(
-        "clusterman.draining.queue.DrainingClient.submit_host_for_draining",
+    ) as mock_down, mock.patch("clusterman.draining.queue.up", autospec=True,) as mock_up, mock.patch(
+        "clusterman.draining.queue.DrainingClient.get_host_to_terminate",
         autospec=True,
-    ) as mock_submit_host_for_draining, mock.patch(
-        "clusterman.draining.queue.arrow",
-        autospec=False,
-    ) as mock_arrow, mock.patch(
-        "clusterman.draining.queue.DEFAULT_FORCE_TERMINATION",
-        new=False,
-    ), mock.patch(
-        "clusterman.draining.queue.host_from_instance_id",
+    ) as mock_get_host_to_terminate, mock.patch(
+        "clusterman.draining.queue.DrainingClient.delete_terminate_messages",
         autospec=True,
-    ) as mock_host_from_instance_id:
-        mock_arrow.now = mock.Mock(return_value=mock.Mock(timestamp=1))
+    ) as mock_delete_terminate_messages:
         mock_mesos_client = mock.Mock()
-        mock_kubernetes_client = mock.Mock()
-        mock_get_host_to_drain.return_value = None
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_mesos_drain.called
-        assert not mock_submit_host_for_termination.called
+        mesos_hosts = [
+            mock.Mock(
+                hostname=f"host{i}",
+                ip=f"10.1.1.{i}",
+                instance_id=f"i{i}",
+                scheduler="mesos",
+                sender="sfr",
+                group_id="sfr123",
+            )
+            for i in range(3)
+        ]
+        failing_host = mock.Mock(
+            hostname="",
+            ip="10.1.1.3",
+            instance_id="i3",
+            scheduler="kubernetes",
+            sender="asg",
+            group_id="asg123",
+        )
+        mock_get_host_to_terminate.side_effect = [*mesos_hosts, failing_host, None]
+
+        def terminate(hosts):
+            if failing_host in hosts:
+                raise Exception("failed")
+
+        mock_terminate.side_effect = terminate
+        assert mock_draining_client.process_termination_queue(mock_mesos_client, None) is True
+        mock_down.assert_called_once_with(mock_mesos_client, ["host0|10.1.1.0", "host1|10.1.1.1", "host2|10.1.1.2"])
+        mock_up.assert_called_once_with(mock_mesos_client, ["host0|10.1.1.0", "host1|10.1.1.1", "host2|10.1.1.2"])
+        # one termination call for each resource group
+        assert mock_terminate.call_args_list == [mock.call(mesos_hosts), mock.call([failing_host])]
+        # the host which failed termination keeps its message in the queue
+        mock_delete_terminate_messages.assert_called_once_with(mock_draining_client, mesos_hosts)
+
+        mock_get_host_to_terminate.side_effect = [*mesos_hosts, None]
+        mock_draining_client.process_termination_queue(mock_mesos_client, None, batch_size=2)
+        assert mock_get_host_to_terminate.call_count == 7
+        mock_delete_terminate_messages.assert_called_with(mock_draining_client, mesos_hosts[:2])
+
+
+def _patch_client_method(name):
+    """Patch a DrainingClient method with a plain mock limited to the method's attributes
+
+    Unlike an autospec'd method, the mock is not bound, so its calls are recorded without the client
+    """
+    # spec from a method bound to a bare (uninitialized) client, so the mock's signature doesn't expect self
+    spec = getattr(DrainingClient.__new__(DrainingClient), name)
+    return mock.patch.object(DrainingClient, name, new_callable=lambda: mock.Mock(spec_set=spec))
+
+
+@contextmanager
+def _patch_drain_steps():
+    """Patch the drain, uncordon and resubmission calls with fresh mocks for one scenario"""
+    with mock.patch.multiple(
+        "clusterman.draining.queue",
+        autospec=True,
+        k8s_drain=mock.DEFAULT,
+        k8s_uncordon=mock.DEFAULT,
+        mesos_drain=mock.DEFAULT,
+    ) as queue_mocks, _patch_client_method("submit_host_for_draining") as mock_submit_host_for_draining, (
+        _patch_client_method("submit_host_for_termination")
+    ) as mock_submit_host_for_termination:
+        yield {
+            **queue_mocks,
+            "submit_host_for_draining": mock_submit_host_for_draining,
+            "submit_host_for_termination": mock_submit_host_for_termination,
+        }
 
-        mock_host = mock.Mock(hostname="")
-        mock_get_host_to_drain.return_value = mock_host
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-        assert not mock_mesos_drain.called
 
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i123",
-            agent_id="agt123",
-            pool="default",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_get_host_to_drain.return_value = mock_host
+@mock.patch("clusterman.draining.queue.host_from_instance_id", autospec=True)
+@mock.patch("clusterman.draining.queue.DEFAULT_FORCE_TERMINATION", new=False)
+@_patch_client_method("delete_drain_messages")
+@_patch_client_method("get_host_to_drain")
+def test_process_drain_queue(
+    mock_get_host_to_drain,
+    mock_delete_drain_messages,
+    mock_host_from_instance_id,
+    mock_draining_client,
+    freeze_now,
+):
+    base_host = Host(
+        hostname="host1",
+        ip="10.1.1.1",
+        group_id="sfr1",
+        instance_id="i123",
+        agent_id="agt123",
+        pool="default",
+        draining_start_time=FROZEN_NOW.for_json(),
+        sender="mmb",
+        receipt_handle="aaaaa",
+    )
+    freeze_now.now.return_value = mock.Mock(timestamp=1)
+    mock_mesos_client = mock.Mock()
+    mock_kubernetes_client = mock.Mock()
+    mock_get_host_to_drain.return_value = None
+    with _patch_drain_steps() as mocks:
         mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        mock_mesos_drain.assert_called_with(
-            mock_mesos_client,
-            ["host1|10.1.1.1"],
-            1000000000,
-            1000000000,
-        )
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
+    assert mock_draining_client.get_host_to_drain.called
+    assert not mocks["mesos_drain"].called
+    assert not mocks["submit_host_for_termination"].called
 
-        # test we can't submit same host twice
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i123",
-            agent_id="agt123",
-            pool="default",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="bbb",
-        )
-        mock_mesos_drain.reset_mock()
-        mock_submit_host_for_termination.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
+    mock_host = mock.Mock(hostname="")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    with _patch_drain_steps() as mocks:
         mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_mesos_drain.called
-        assert not mock_submit_host_for_termination.called
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
+    mocks["submit_host_for_termination"].assert_called_with(mock_host, delay=0)
+    mock_delete_drain_messages.assert_called_with([mock_host])
+    assert not mocks["mesos_drain"].called
 
-        # test kubernetes scheduler
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i1234",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
+    mock_host = base_host
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    with _patch_drain_steps() as mocks:
         mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        mock_k8s_drain.assert_called_with(
-            mock_kubernetes_client,
-            "agt123",
-            False,
-        )
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
+    assert mock_draining_client.get_host_to_drain.called
+    mocks["mesos_drain"].assert_called_with(
+        mock_mesos_client,
+        ["host1|10.1.1.1"],
+        1000000000,
+        1000000000,
+    )
+    mocks["submit_host_for_termination"].assert_called_with(mock_host)
+    mock_delete_drain_messages.assert_called_with([mock_host])
 
-        # test kubernetes scheduler for failed k8s_drain
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i12345",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_submit_host_for_termination.reset_mock()
-        mock_k8s_drain.reset_mock()
-        mock_k8s_drain.return_value = False
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = now
+    # test we can't submit same host twice
+    mock_host = base_host._replace(receipt_handle="bbb")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    with _patch_drain_steps() as mocks:
         mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_k8s_drain.called
-        assert mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-
-        # test again for same host. let's assume there is no blocks for PDB, then mock_k8s_drain returns true
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i12345",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-            attempt=2,
-        )
-        mock_k8s_drain.reset_mock()
-        mock_k8s_drain.return_value = True
-        mock_submit_host_for_draining.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = now
+    assert mock_draining_client.get_host_to_drain.called
+    assert not mocks["mesos_drain"].called
+    assert not mocks["submit_host_for_termination"].called
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test kubernetes scheduler
+    mock_host = base_host._replace(instance_id="i1234", scheduler="kubernetes")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW
+    with _patch_drain_steps() as mocks:
+        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
+    assert mock_draining_client.get_host_to_drain.called
+    assert not mocks["submit_host_for_draining"].called
+    assert not mocks["k8s_uncordon"].called
+    mocks["k8s_drain"].assert_called_with(
+        mock_kubernetes_client,
+        "agt123",
+        False,
+    )
+    mocks["submit_host_for_termination"].assert_called_with(mock_host, delay=0)
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test kubernetes scheduler for failed k8s_drain
+    mock_host = base_host._replace(instance_id="i12345", scheduler="kubernetes")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW
+    with _patch_drain_steps() as mocks:
+        mocks["k8s_drain"].return_value = False
+        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
+    assert mocks["k8s_drain"].called
+    assert mocks["submit_host_for_draining"].called
+    assert not mocks["k8s_uncordon"].called
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test again for same host. let's assume there is no blocks for PDB, then mock_k8s_drain returns true
+    mock_host = base_host._replace(instance_id="i12345", scheduler="kubernetes", attempt=2)
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW
+    with _patch_drain_steps() as mocks:
+        mocks["k8s_drain"].return_value = True
+        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
+    assert mock_draining_client.get_host_to_drain.called
+    assert not mocks["submit_host_for_draining"].called
+    assert not mocks["k8s_uncordon"].called
+    mocks["k8s_drain"].assert_called_with(
+        mock_kubernetes_client,
+        "agt123",
+        False,
+    )
+    mocks["submit_host_for_termination"].assert_called_with(mock_host, delay=0)
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test kubernetes scheduler for expired draining
+    mock_host = base_host._replace(instance_id="i123456", scheduler="kubernetes")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW.shift(hours=100)
+    with _patch_drain_steps() as mocks:
+        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
+    assert not mocks["k8s_drain"].called
+    assert mocks["k8s_uncordon"].called
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test kubernetes scheduler for expired draining, but force_termination is true
+    mock_host = base_host._replace(instance_id="i1234567", scheduler="kubernetes")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW.shift(hours=100)
+    with _patch_drain_steps() as mocks, mock.patch("clusterman.draining.queue.DEFAULT_FORCE_TERMINATION", new=True):
+        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
+    assert not mocks["k8s_drain"].called
+    assert not mocks["k8s_uncordon"].called
+    mocks["submit_host_for_termination"].assert_called_with(mock_host, delay=0)
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+    # test kubernetes scheduler again after uncordon. cache shouldn't block draining
+    mock_host = base_host._replace(instance_id="i123456", scheduler="kubernetes")
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    freeze_now.now.return_value = FROZEN_NOW
+    with _patch_drain_steps() as mocks:
         mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
+    assert mock_draining_client.get_host_to_drain.called
+    assert not mocks["submit_host_for_draining"].called
+    assert not mocks["k8s_uncordon"].called
+    mocks["k8s_drain"].assert_called_with(
+        mock_kubernetes_client,
+        "agt123",
+        False,
+    )
+    mocks["submit_host_for_termination"].assert_called_with(mock_host, delay=0)
+    mock_delete_drain_messages.assert_called_with([mock_host])
+
+
+@pytest.mark.parametrize(
+    "fresh_agent_id,expect_termination,expect_redraining",
+    [
+        (None, False, False),  # ec2 instance doesn't exist
+        ("", True, False),  # ec2 instance doesn't have agent_id
+        ("agt123", False, True),  # ec2 instance exists
+    ],
+)
+@mock.patch("clusterman.draining.queue.host_from_instance_id", autospec=True)
+@_patch_client_method("submit_host_for_draining")
+@_patch_client_method("submit_host_for_termination")
+@_patch_client_method("delete_drain_messages")
+@_patch_client_method("get_host_to_drain")
+@mock.patch("clusterman.draining.queue.k8s_uncordon", autospec=True)
+@mock.patch("clusterman.draining.queue.k8s_drain", autospec=True)
+def test_process_drain_queue_orphan_host(
+    mock_k8s_drain,
+    mock_k8s_uncordon,
+    mock_get_host_to_drain,
+    mock_delete_drain_messages,
+    mock_submit_host_for_termination,
+    mock_submit_host_for_draining,
+    mock_host_from_instance_id,
+    fresh_agent_id,
+    expect_termination,
+    expect_redraining,
+    mock_draining_client,
+):
+    mock_host = Host(
+        hostname="host1",
+        ip="10.1.1.1",
+        group_id="sfr1",
+        instance_id="i123",
+        agent_id="",
+        pool="default",
+        scheduler="kubernetes",
+        draining_start_time=FROZEN_NOW.for_json(),
+        sender="mmb",
+        receipt_handle="aaaaa",
+    )
+    mock_host_fresh = mock_host._replace(agent_id=fresh_agent_id) if fresh_agent_id is not None else None
+    mock_get_host_to_drain.side_effect = [mock_host, None]
+    mock_host_from_instance_id.return_value = mock_host_fresh
+
+    mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock())
+    assert not mock_k8s_uncordon.called
+    assert not mock_k8s_drain.called
+    if expect_termination:
+        mock_submit_host_for_termination.assert_called_with(mock_host, delay=0)
+    else:
+        assert not mock_submit_host_for_termination.called
+    if expect_redraining:
+        mock_submit_host_for_draining.assert_called_with(mock_host_fresh, attempt=2)
+    else:
         assert not mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        mock_k8s_drain.assert_called_with(
-            mock_kubernetes_client,
-            "agt123",
-            False,
-        )
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
+    mock_delete_drain_messages.assert_called_with([mock_host])
 
-        # test kubernetes scheduler for expired draining
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i123456",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_submit_host_for_termination.reset_mock()
-        mock_k8s_drain.reset_mock()
-        mock_submit_host_for_draining.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time).shift(hours=100)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert not mock_k8s_drain.called
-        assert mock_k8s_uncordon.called
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
 
-        # test kubernetes scheduler for expired draining, but force_termination is true
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
+@_patch_client_method("delete_drain_messages")
+@_patch_client_method("get_host_to_drain")
+def test_process_drain_queue_batch(mock_get_host_to_drain, mock_delete_drain_messages, mock_draining_client):
+    hosts = [
+        Host(
+            instance_id=f"i{i}",
+            hostname=f"host{i}",
             group_id="sfr1",
-            instance_id="i1234567",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_submit_host_for_termination.reset_mock()
-        mock_k8s_drain.reset_mock()
-        mock_k8s_uncordon.reset_mock()
-        mock_submit_host_for_draining.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time).shift(hours=100)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        with mock.patch("clusterman.draining.queue.DEFAULT_FORCE_TERMINATION", new=True):
-            mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert not mock_k8s_drain.called
-        assert not mock_k8s_uncordon.called
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-
-        # test kubernetes scheduler again after uncordon. cache shouldn't block draining
-        mock_host = Host(
-            hostname="host1",
             ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i123456",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
             sender="mmb",
-            receipt_handle="aaaaa",
+            receipt_handle=f"rcpt{i}",
+            scheduler="other",
         )
-        mock_k8s_uncordon.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        mock_k8s_drain.assert_called_with(
-            mock_kubernetes_client,
-            "agt123",
-            False,
-        )
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-
-        # test kubernetes scheduler for orphan instances - ec2 doesn't exist
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
+        for i in range(11)
+    ]
+    mock_get_host_to_drain.side_effect = hosts + [None]
+    with _patch_drain_steps() as mocks:
+        assert mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock()) is True
+    # only the first host can wait on SQS, the rest of the batch comes from already received messages
+    assert mock_get_host_to_drain.call_args_list == [mock.call(max_messages=10)] + [mock.call(buffered_only=True)] * 9
+    assert mocks["submit_host_for_termination"].call_count == 10
+    mock_delete_drain_messages.assert_called_once_with(hosts[:10])
+
+    # messages of hosts handled before a failure are still deleted
+    mock_delete_drain_messages.reset_mock()
+    mock_draining_client.draining_host_ttl_cache.clear()
+    mock_get_host_to_drain.side_effect = hosts[:2] + [None]
+    with _patch_drain_steps() as mocks, pytest.raises(ValueError):
+        mocks["submit_host_for_termination"].side_effect = [None, ValueError]
+        mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock())
+    mock_delete_drain_messages.assert_called_once_with(hosts[:1])
+
+
+@_patch_client_method("delete_drain_messages")
+@_patch_client_method("get_host_to_drain")
+def test_process_drain_queue_slow_batch(mock_get_host_to_drain, mock_delete_drain_messages, mock_draining_client):
+    hosts = [
+        Host(
+            instance_id=f"i{i}",
+            hostname=f"host{i}",
             group_id="sfr1",
-            instance_id="i123456789",
-            agent_id="",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-        mock_k8s_drain.reset_mock()
-        mock_submit_host_for_draining.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        mock_host_from_instance_id.return_value = None
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        assert not mock_k8s_drain.called
-        #  mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-
-        # test kubernetes scheduler for orphan instances - ec2 doesn't have agent_id
-        mock_host = Host(
-            hostname="host1",
             ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i1234567891",
-            agent_id="",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
             sender="mmb",
-            receipt_handle="aaaaa",
+            receipt_handle=f"rcpt{i}",
+            scheduler="other",
         )
-
-        mock_k8s_drain.reset_mock()
-        mock_submit_host_for_termination.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        mock_host_from_instance_id.return_value = mock_host
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_submit_host_for_draining.called
-        assert not mock_k8s_uncordon.called
-        assert not mock_k8s_drain.called
-        mock_submit_host_for_termination.assert_called_with(mock_draining_client, mock_host, delay=0)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
-
-        # test kubernetes scheduler for orphan instances - ec2 exists
-        mock_host = Host(
-            hostname="host1",
-            ip="10.1.1.1",
+        for i in range(3)
+    ]
+    mock_get_host_to_drain.side_effect = hosts + [None]
+    clock = [0.0]
+
+    def slow_submission(*args, **kwargs):
+        clock[0] += 10
+
+    with _patch_drain_steps() as mocks, mock.patch("clusterman.draining.queue.time.monotonic", lambda: clock[0]):
+        mocks["submit_host_for_termination"].side_effect = slow_submission
+        assert mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock()) is True
+    # halfway through the 30s visibility timeout, the messages of the whole batch get renewed
+    change_visibility = mock_draining_client.client.change_message_visibility_batch
+    change_visibility.assert_called_once_with(
+        QueueUrl=mock_draining_client.drain_queue_url,
+        Entries=[
+            {"Id": str(i), "ReceiptHandle": host.receipt_handle, "VisibilityTimeout": 30}
+            for i, host in enumerate(hosts)
+        ],
+    )
+    mock_delete_drain_messages.assert_called_once_with(hosts)
+
+
+@_patch_client_method("delete_drain_messages")
+@_patch_client_method("get_host_to_drain")
+def test_process_drain_queue_failed_submissions(
+    mock_get_host_to_drain, mock_delete_drain_messages, mock_draining_client
+):
+    hosts = [
+        Host(
+            instance_id=f"i{i}",
+            hostname=f"host{i}",
             group_id="sfr1",
-            instance_id="i12345678912",
-            agent_id="",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
-            sender="mmb",
-            receipt_handle="aaaaa",
-        )
-
-        mock_host_fresh = Host(
-            hostname="host1",
             ip="10.1.1.1",
-            group_id="sfr1",
-            instance_id="i12345678912",
-            agent_id="agt123",
-            pool="default",
-            scheduler="kubernetes",
-            draining_start_time=now.for_json(),
             sender="mmb",
-            receipt_handle="aaaaa",
+            receipt_handle=f"rcpt{i}",
+            scheduler="other",
         )
+        for i in range(3)
+    ]
+    mock_get_host_to_drain.side_effect = hosts + [None]
+    mock_draining_client.client.send_message_batch.return_value = {"Successful": [], "Failed": [{"Id": "1"}]}
+    assert mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock()) is True
+    # all follow-up submissions are sent in one batch
+    assert mock_draining_client.client.send_message_batch.call_count == 1
+    assert len(mock_draining_client.client.send_message_batch.call_args[1]["Entries"]) == 3
+    # the drain message of the host whose termination couldn't be submitted is kept, so it gets retried
+    mock_delete_drain_messages.assert_called_once_with([hosts[0], hosts[2]])
+    assert set(mock_draining_client.draining_host_ttl_cache) == {"i0", "i2"}
+
+
+def test_process_drain_queue_concurrently(mock_draining_client):
+    # workers only get through the barrier if all of them are running at the same time
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_all_workers(*args):
+        barrier.wait()
+        return True
+
+    with mock.patch.object(
+        mock_draining_client,
+        "process_drain_queue",
+        side_effect=wait_for_all_workers,
+    ) as mock_process_drain_queue:
+        assert mock_draining_client.process_drain_queue_concurrently(None, None, num_workers=3) is True
+        assert mock_process_drain_queue.call_count == 3
+
+        mock_process_drain_queue.side_effect = None
+        mock_process_drain_queue.return_value = False
+        assert mock_draining_client.process_drain_queue_concurrently(None, None, num_workers=3) is False
+
+
+@_patch_client_method("get_host_to_drain")
+def test_process_drain_queue_submissions_kept_apart(mock_get_host_to_drain, mock_draining_client):
+    host = Host(
+        instance_id="i1",
+        hostname="host1",
+        group_id="sfr1",
+        ip="10.1.1.1",
+        sender="mmb",
+        receipt_handle="rcpt1",
+        scheduler="other",
+    )
+    mock_get_host_to_drain.side_effect = [host, None]
+    sqs_calls = mock.Mock()
+    sqs_calls.attach_mock(mock_draining_client.client.send_message_batch, "send_message_batch")
+    sqs_calls.attach_mock(mock_draining_client.client.delete_message_batch, "delete_message_batch")
+    submit_host_for_termination = mock_draining_client.submit_host_for_termination
+
+    def submit_and_flush_elsewhere(*args, **kwargs):
+        submit_host_for_termination(*args, **kwargs)
+        # another worker flushing meanwhile must not pick up (and still be sending) this batch's submissions
+        flusher = threading.Thread(target=mock_draining_client.flush)
+        flusher.start()
+        flusher.join()
+        assert not sqs_calls.send_message_batch.called
+
+    with mock.patch.object(mock_draining_client, "submit_host_for_termination", side_effect=submit_and_flush_elsewhere):
+        assert mock_draining_client.process_drain_queue(mock.Mock(), mock.Mock()) is True
+    assert [name for name, _, _ in sqs_calls.mock_calls] == ["send_message_batch", "delete_message_batch"]
+
+
+def test_mark_host_as_processing(mock_draining_client):
+    host = Host(instance_id="i123", hostname="host123", group_id="sfr123", ip="10.1.1.1", sender="", receipt_handle="")
+    with mock.patch("clusterman.draining.queue.time.monotonic", return_value=100.0) as mock_monotonic:
+        assert mock_draining_client._mark_host_as_processing(host) is True
+        assert mock_draining_client._mark_host_as_processing(host) is False
+        mock_monotonic.return_value = 200.0
+        assert mock_draining_client._mark_host_as_processing(host._replace(attempt=2)) is True
+        assert mock_draining_client.draining_host_ttl_cache["i123"] == 2000.0
+
+        # expired entries are swept, after which the host can be processed again
+        mock_monotonic.return_value = 2001.0
+        mock_draining_client.clean_processing_hosts_cache()
+        assert mock_draining_client._mark_host_as_processing(host) is True
 
-        mock_k8s_drain.reset_mock()
-        mock_submit_host_for_termination.reset_mock()
-        mock_submit_host_for_draining.reset_mock()
-        mock_get_host_to_drain.return_value = mock_host
-        mock_arrow.now.return_value = arrow.get(mock_host.draining_start_time)
-        mock_arrow.get.return_value = arrow.get(mock_host.draining_start_time)
-        mock_host_from_instance_id.return_value = mock_host_fresh
-        mock_draining_client.process_drain_queue(mock_mesos_client, mock_kubernetes_client)
-        assert mock_draining_client.get_host_to_drain.called
-        assert not mock_k8s_uncordon.called
-        assert not mock_k8s_drain.called
-        assert not mock_submit_host_for_termination.called
-        mock_submit_host_for_draining.assert_called_with(mock_draining_client, mock_host_fresh, attempt=2)
-        mock_delete_drain_messages.assert_called_with(mock_draining_client, [mock_host])
+
+def test_mark_host_as_processing_by_instance_id(mock_draining_client):
+    host = Host(instance_id="i123", hostname="host123", group_id="sfr123", ip="10.1.1.1", sender="", receipt_handle="a")
+    duplicate_host = host._replace(receipt_handle="b", draining_start_time="2018-12-17T16:02:00")
+    # hosts keep full value equality, deduplication only looks at the instance ID
+    assert host != duplicate_host
+    assert mock_draining_client._mark_host_as_processing(host) is True
+    assert mock_draining_client._mark_host_as_processing(duplicate_host) is False
 
 
 def test_clean_processing_hosts_cache(mock_draining_client):
-    mock_draining_client.draining_host_ttl_cache["i123"] = arrow.get("2018-12-17T16:01:59")
-    mock_draining_client.draining_host_ttl_cache["i456"] = arrow.get("2018-12-17T16:02:00")
-    with mock.patch("clusterman.draining.queue.arrow", autospec=False) as mock_arrow, mock.patch(
+    mock_draining_client.draining_host_ttl_cache["i123"] = 1199.0
+    mock_draining_client.draining_host_ttl_cache["i456"] = 1200.0
+    with mock.patch("clusterman.draining.queue.time.monotonic", return_value=1200.0), mock.patch(
         "clusterman.draining.queue.DRAIN_CACHE_SECONDS", 60
     ):
-        mock_arrow.now = mock.Mock(return_value=arrow.get("2018-12-17T16:02:00"))
         mock_draining_client.clean_processing_hosts_cache()
         assert "i123" not in mock_draining_client.draining_host_ttl_cache
         assert "i456" in mock_draining_client.draining_host_ttl_cache
 
 
-def test_process_warning_queue(mock_draining_client):
-    with mock.patch("clusterman.draining.queue.SpotFleetResourceGroup.load",) as mock_srf_load_spot, mock.patch(
-        "clusterman.draining.queue.DrainingClient.submit_host_for_draining",
-        autospec=True,
-    ) as mock_submit_host_for_draining, mock.patch(
-        "clusterman.draining.queue.DrainingClient.delete_warning_messages",
-        autospec=True,
+def test_process_warning_queue(mock_draining_client, patch_autospec):
+    mock_get_pools = patch_autospec("clusterman.draining.queue.get_pool_name_list")
+    with _patch_client_method("submit_host_for_draining") as mock_submit_host_for_draining, _patch_client_method(
+        "delete_warning_messages"
     ) as mock_delete_warning_messages, mock.patch(
-        "clusterman.draining.queue.get_pool_name_list",
-        autospec=True,
-    ) as mock_get_pools, mock.patch(
+        "clusterman.draining.queue.SpotFleetResourceGroup.load",
+    ) as mock_srf_load_spot, mock.patch(
         "clusterman.draining.queue.AutoScalingResourceGroup.load",
     ) as mock_asg_load_spot:
         mock_srf_load_spot.return_value = {}
@@ -844,14 +1138,14 @@ def test_process_warning_queue(mock_draining_client):
         mock_draining_client.get_warned_host = mock.Mock(return_value=mock_host)
         mock_draining_client.process_warning_queue()
         assert not mock_submit_host_for_draining.called
-        mock_delete_warning_messages.assert_called_with(mock_draining_client, [mock_host])
+        mock_delete_warning_messages.assert_called_with([mock_host])
 
         mock_srf_load_spot.return_value = {"sfr-123": {}}
         mock_host = mock.Mock(group_id="sfr-123")
         mock_draining_client.get_warned_host = mock.Mock(return_value=mock_host)
         mock_draining_client.process_warning_queue()
-        mock_submit_host_for_draining.assert_called_with(mock_draining_client, mock_host)
-        mock_delete_warning_messages.assert_called_with(mock_draining_client, [mock_host])
+        mock_submit_host_for_draining.assert_called_with(mock_host)
+        mock_delete_warning_messages.assert_called_with([mock_host])
 
         mock_srf_load_spot.return_value = {}
         mock_asg_load_spot.return_value = {"sfr-123": {}}
@@ -859,8 +1153,47 @@ def test_process_warning_queue(mock_draining_client):
         mock_submit_host_for_draining.reset_mock()
         mock_draining_client.get_warned_host = mock.Mock(return_value=mock_host)
         mock_draining_client.process_warning_queue()
-        mock_submit_host_for_draining.assert_called_with(mock_draining_client, mock_host)
-        mock_delete_warning_messages.assert_called_with(mock_draining_client, [mock_host])
+        mock_submit_host_for_draining.assert_called_with(mock_host)
+        mock_delete_warning_messages.assert_called_with([mock_host])
+
+
+def _describe_instances_response(tags, **instance):
+    return [{**instance, "Tags": [{"Key": key, "Value": value} for key, value in tags]}]
+
+
+def test_host_from_instance_id_cached(patch_autospec):
+    mock_ec2_describe = patch_autospec("clusterman.draining.queue.ec2_describe_instances")
+    patch_autospec("socket.gethostbyaddr")
+    mock_ec2_describe.return_value = []
+    assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123") is None
+    assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123") is None
+    # failed lookups are not cached
+    assert mock_ec2_describe.call_count == 2
+
+    mock_ec2_describe.return_value = _describe_instances_response([SFR_TAG], **AGENT_ADDRESSES)
+    first_host = host_from_instance_id(receipt_handle="rcpt1", instance_id="i-123")
+    second_host = host_from_instance_id(receipt_handle="rcpt2", instance_id="i-123", pool="default")
+    assert mock_ec2_describe.call_count == 3
+    assert (first_host.receipt_handle, first_host.pool) == ("rcpt1", "")
+    assert (second_host.receipt_handle, second_host.pool) == ("rcpt2", "default")
+    assert first_host.agent_id == second_host.agent_id == "agt123"
+
+
+def test_host_from_instance_id_cache_expiry(patch_autospec):
+    mock_ec2_describe = patch_autospec("clusterman.draining.queue.ec2_describe_instances")
+    patch_autospec("socket.gethostbyaddr")
+    mock_ec2_describe.return_value = _describe_instances_response([SFR_TAG], **AGENT_ADDRESSES)
+    mock_timer = mock.Mock(return_value=0)
+    expiring_cache = cachetools.TTLCache(maxsize=1, ttl=INSTANCE_DETAILS_CACHE_SECONDS, timer=mock_timer)
+    with mock.patch("clusterman.draining.queue._instance_details_cache", expiring_cache):
+        host_from_instance_id(receipt_handle="rcpt1", instance_id="i-123")
+        mock_timer.return_value = INSTANCE_DETAILS_CACHE_SECONDS - 1
+        host_from_instance_id(receipt_handle="rcpt2", instance_id="i-123")
+        assert mock_ec2_describe.call_count == 1
+
+        mock_timer.return_value = INSTANCE_DETAILS_CACHE_SECONDS + 1
+        host_from_instance_id(receipt_handle="rcpt3", instance_id="i-123")
+        assert mock_ec2_describe.call_count == 2
 
 
 def test_terminate_host():
@@ -872,112 +1205,122 @@ def test_terminate_host():
         mock_sfr.return_value.terminate_instances_by_id.assert_called_with(["i123"])
 
 
-def test_host_from_instance_id():
-    now = arrow.now()
-    with mock.patch(
-        "clusterman.draining.queue.ec2_describe_instances",
-        autospec=True,
-    ) as mock_ec2_describe, mock.patch("socket.gethostbyaddr", autospec=True,) as mock_gethostbyaddr, mock.patch(
-        "clusterman.draining.queue.arrow", autospec=False
-    ) as mock_arrow:
-        mock_ec2_describe.return_value = []
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
-        )
+def test_terminate_hosts_forgets_instance_details():
+    mock_host = mock.Mock(instance_id="i123", sender="sfr", group_id="sfr123")
+    _instance_details_cache["i123"] = mock.sentinel.details
+    _instance_details_cache["i456"] = mock.sentinel.other_details
+    with mock.patch.dict("clusterman.draining.queue.RESOURCE_GROUPS", {"sfr": mock.Mock()}, clear=True):
+        terminate_hosts([mock_host])
+    assert "i123" not in _instance_details_cache
+    assert "i456" in _instance_details_cache
 
-        mock_ec2_describe.return_value = [{"Tags": [{"Key": "thing", "Value": "bar"}]}]
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
-        )
 
-        mock_ec2_describe.return_value = [{"Tags": [{"Key": "aws:ec2spot:fleet-request-id", "Value": "sfr-123"}]}]
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
+def test_terminate_hosts():
+    mock_hosts = [
+        mock.Mock(instance_id="i123", sender="sfr", group_id="sfr123"),
+        mock.Mock(instance_id="i456", sender="asg", group_id="asg123"),
+        mock.Mock(instance_id="i789", sender="sfr", group_id="sfr123"),
+    ]
+    mock_sfr = mock.Mock()
+    mock_asg = mock.Mock()
+    with mock.patch.dict("clusterman.draining.queue.RESOURCE_GROUPS", {"sfr": mock_sfr, "asg": mock_asg}, clear=True):
+        terminate_hosts(mock_hosts)
+        mock_sfr.assert_called_once_with("sfr123")
+        mock_sfr.return_value.terminate_instances_by_id.assert_called_once_with(["i123", "i789"])
+        mock_asg.assert_called_once_with("asg123")
+        mock_asg.return_value.terminate_instances_by_id.assert_called_once_with(["i456"])
+
+
+def test_host_from_instance_id(patch_autospec):
+    mock_ec2_describe = patch_autospec("clusterman.draining.queue.ec2_describe_instances")
+    mock_gethostbyaddr = patch_autospec("socket.gethostbyaddr")
+    mock_ec2_describe.return_value = []
+    assert (
+        host_from_instance_id(
+            receipt_handle="rcpt",
+            instance_id="i-123",
         )
+        is None
+    )
 
-        mock_arrow.now.return_value = now
-        mock_ec2_describe.return_value = [
-            {
-                "PrivateIpAddress": "10.1.1.1",
-                "PrivateDnsName": "agt123",
-                "Tags": [{"Key": "aws:ec2spot:fleet-request-id", "Value": "sfr-123"}],
-            }
-        ]
-        assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123",) == Host(
-            sender="sfr",
+    mock_ec2_describe.return_value = _describe_instances_response([("thing", "bar")])
+    assert (
+        host_from_instance_id(
             receipt_handle="rcpt",
             instance_id="i-123",
-            hostname=mock_gethostbyaddr.return_value[0],
-            group_id="sfr-123",
-            ip="10.1.1.1",
-            agent_id="agt123",
-            pool="",
-            termination_reason=TerminationReason.SPOT_INTERRUPTION.value,
-            draining_start_time=now.for_json(),
         )
+        is None
+    )
 
-        mock_ec2_describe.return_value = [
-            {
-                "PrivateIpAddress": "10.1.1.1",
-                "PrivateDnsName": "agt123",
-                "Tags": [
-                    {"Key": "aws:autoscaling:groupName", "Value": "grp-123"},
-                    {"Key": "KubernetesCluster", "Value": "clstr-123"},
-                ],
-            }
-        ]
-        assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123",) == Host(
-            sender="asg",
+    mock_ec2_describe.return_value = _describe_instances_response([SFR_TAG])
+    assert (
+        host_from_instance_id(
             receipt_handle="rcpt",
             instance_id="i-123",
-            hostname=mock_gethostbyaddr.return_value[0],
-            group_id="grp-123",
-            ip="10.1.1.1",
-            agent_id="agt123",
-            pool="",
-            scheduler="kubernetes",
-            termination_reason=TerminationReason.SPOT_INTERRUPTION.value,
-            draining_start_time=now.for_json(),
         )
+        is None
+    )
 
-        mock_gethostbyaddr.side_effect = socket.error
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
+    mock_ec2_describe.return_value = _describe_instances_response([SFR_TAG], **AGENT_ADDRESSES)
+    assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123",) == Host(
+        sender="sfr",
+        receipt_handle="rcpt",
+        instance_id="i-123",
+        hostname=mock_gethostbyaddr.return_value[0],
+        group_id="sfr-123",
+        ip="10.1.1.1",
+        agent_id="agt123",
+        pool="",
+        termination_reason=TerminationReason.SPOT_INTERRUPTION.value,
+        draining_start_time=FROZEN_NOW.for_json(),
+    )
+
+    _instance_details_cache.clear()
+    mock_ec2_describe.return_value = _describe_instances_response(
+        [("aws:autoscaling:groupName", "grp-123"), ("KubernetesCluster", "clstr-123")],
+        **AGENT_ADDRESSES,
+    )
+    assert host_from_instance_id(receipt_handle="rcpt", instance_id="i-123",) == Host(
+        sender="asg",
+        receipt_handle="rcpt",
+        instance_id="i-123",
+        hostname=mock_gethostbyaddr.return_value[0],
+        group_id="grp-123",
+        ip="10.1.1.1",
+        agent_id="agt123",
+        pool="",
+        scheduler="kubernetes",
+        termination_reason=TerminationReason.SPOT_INTERRUPTION.value,
+        draining_start_time=FROZEN_NOW.for_json(),
+    )
+
+    _instance_details_cache.clear()
+    mock_gethostbyaddr.side_effect = socket.error
+    assert (
+        host_from_instance_id(
+            receipt_handle="rcpt",
+            instance_id="i-123",
         )
+        is None
+    )
 
-        # instance has no tags, probably because it is new and tags have not
-        # yet propagated
-        mock_ec2_describe.return_value = [{"InstanceId": "i-123"}]
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
+    # instance has no tags, probably because it is new and tags have not
+    # yet propagated
+    mock_ec2_describe.return_value = [{"InstanceId": "i-123"}]
+    assert (
+        host_from_instance_id(
+            receipt_handle="rcpt",
+            instance_id="i-123",
         )
+        is None
+    )
 
-        # describe method throws exception when instance doesn't exist
-        mock_ec2_describe.side_effect = ClientError({}, "")
-        assert (
-            host_from_instance_id(
-                receipt_handle="rcpt",
-                instance_id="i-123",
-            )
-            is None
+    # describe method throws exception when instance doesn't exist
+    mock_ec2_describe.side_effect = ClientError({}, "")
+    assert (
+        host_from_instance_id(
+            receipt_handle="rcpt",
+            instance_id="i-123",
         )
+        is None
+    )
@@ -339,6 +339,17 @@ def test_get_agent_metadata(mock_cluster_connector, ip_address, expected_state):
     assert agent_metadata.state == expected_state
 
 
+def test_get_agent_metadata_bulk(mock_cluster_connector):
+    agents = mock_cluster_connector.get_agent_metadata_bulk(["10.10.10.1", "10.10.10.2", "1.2.3.4", None])
+    assert {ip: agent.state for ip, agent in agents.items()} == {
+        "10.10.10.1": AgentState.IDLE,
+        "10.10.10.2": AgentState.RUNNING,
+        "1.2.3.4": AgentState.ORPHANED,
+        None: AgentState.UNKNOWN,
+    }
+    assert agents["10.10.10.1"].agent_id == "node1"
+
+
 def test_get_nodes_by_ip(mock_cluster_connector):
     mock_cluster_connector._core_api.list_node.reset_mock()
     mock_cluster_connector.set_label_selectors(["foobar.clusterman.com/something=stuff"], add_to_existing=True)
@@ -353,6 +364,26 @@ def test_reload_state_no_pods(mock_cluster_connector):
     assert mock_cluster_connector._pods_by_ip == {"10.10.10.1": [], "10.10.10.2": [], "10.10.10.3": []}
 
 
+def test_reload_state_keep_pods(mock_cluster_connector, running_pod_1):
+    node2_pods = list(mock_cluster_connector._pods_by_ip["10.10.10.2"])
+    assert running_pod_1 in node2_pods
+    mock_cluster_connector._core_api.list_pod_for_all_namespaces.reset_mock()
+    mock_cluster_connector.reload_state(load_pods_info=None)
+    mock_cluster_connector._core_api.list_pod_for_all_namespaces.assert_not_called()
+    assert mock_cluster_connector._pods_by_ip["10.10.10.1"] == []
+    assert mock_cluster_connector._pods_by_ip["10.10.10.2"] == node2_pods
+    assert set(mock_cluster_connector._pods_by_ip) == {"10.10.10.1", "10.10.10.2", "10.10.10.3"}
+
+    # pods of nodes which went away are trimmed
+    nodes = mock_cluster_connector._core_api.list_node.return_value.items
+    mock_cluster_connector._core_api.list_node.return_value.items = [
+        node for node in nodes if node.status.addresses[0].address != "10.10.10.2"
+    ]
+    mock_cluster_connector.reload_state(load_pods_info=None)
+    assert set(mock_cluster_connector._pods_by_ip) == {"10.10.10.1", "10.10.10.3"}
+    assert not any(running_pod_1 in pods for pods in mock_cluster_connector._pods_by_ip.values())
+
+
 def test_allocation(mock_cluster_connector):
     assert mock_cluster_connector.get_resource_allocation("cpus") == 7.5
 
@@ -380,6 +411,16 @@ def test_pending_cpus(mock_cluster_connector):
     assert mock_cluster_connector.get_resource_pending("cpus") == 1.5
 
 
+def test_pending_pods_info_computed_on_reload(mock_cluster_connector):
+    with mock.patch.object(mock_cluster_connector, "_get_pod_unschedulable_reason") as mock_get_reason:
+        mock_cluster_connector.get_unschedulable_pods()
+        mock_cluster_connector.has_enough_capacity_for_pods()
+        mock_cluster_connector.get_resource_pending("mem")
+        assert mock_get_reason.call_count == 0
+        mock_cluster_connector.reload_state()
+        assert mock_get_reason.call_count == 1
+
+
 def test_pod_belongs_to_daemonset(mock_cluster_connector, running_pod_1, daemonset_pod):
     assert not mock_cluster_connector._pod_belongs_to_daemonset(running_pod_1)
     assert mock_cluster_connector._pod_belongs_to_daemonset(daemonset_pod)
@@ -525,3 +566,51 @@ def test_has_enough_capacity_for_pods(mock_cluster_connector, unschedulable, exp
     with mock.patch.object(mock_cluster_connector, "get_unschedulable_pods") as mock_get_unsched:
         mock_get_unsched.return_value = unschedulable
         assert mock_cluster_connector.has_enough_capacity_for_pods() is expected
+
+
+@mock.patch("clusterman.kubernetes.kubernetes_cluster_connector.PoolEventWatcher", autospec=True)
+def test_wait_for_pool_events(mock_watcher_cls, mock_cluster_connector):
+    mock_cluster_connector._resource_versions = {"nodes": "123", "pods": "456"}
+    mock_watcher = mock_watcher_cls.return_value
+    mock_watcher.wait.return_value = True
+    assert mock_cluster_connector.wait_for_pool_events(10) is True
+    assert mock_cluster_connector.wait_for_pool_events(5, watch_pods=False) is True
+    mock_watcher_cls.assert_called_once_with()
+    assert mock_watcher.follow.call_args_list == [
+        mock.call(
+            "nodes",
+            mock_cluster_connector._core_api.list_node,
+            {"label_selector": "clusterman.com/pool=bar"},
+            mock_cluster_connector._is_relevant_node_event,
+            "123",
+        ),
+        mock.call(
+            "pods",
+            mock_cluster_connector._core_api.list_pod_for_all_namespaces,
+            {"field_selector": "status.phase=Pending"},
+            mock_cluster_connector._is_relevant_pod_event,
+            "456",
+        ),
+        mock.call(
+            "nodes",
+            mock_cluster_connector._core_api.list_node,
+            {"label_selector": "clusterman.com/pool=bar"},
+            mock_cluster_connector._is_relevant_node_event,
+            "123",
+        ),
+    ]
+    assert mock_watcher.wait.call_args_list == [mock.call(10, None), mock.call(5, None)]
+
+    mock_cluster_connector.reload_state()
+    mock_watcher.discard_pending.assert_called_once_with()
+    mock_cluster_connector.stop_watching_pool_events()
+    mock_watcher.stop.assert_called_once_with()
+    assert mock_cluster_connector._pool_event_watcher is None
+
+
+def test_get_pod_watch_kwargs_with_labels(mock_cluster_connector):
+    with mock.patch.object(mock_cluster_connector.pool_config, "read_bool", return_value=True):
+        assert mock_cluster_connector._get_pod_watch_kwargs() == {
+            "field_selector": "status.phase=Pending",
+            "label_selector": "clusterman.com/pool=bar",
+        }
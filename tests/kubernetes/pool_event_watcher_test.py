@@ -0,0 +1,103 @@
+# Copyright 2019 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from multiprocessing import Event
+from unittest import mock
+
+import pytest
+
+from clusterman.kubernetes.pool_event_watcher import PoolEventWatcher
+
+
+@pytest.fixture
+def watcher():
+    return PoolEventWatcher(min_wakeup_interval=0)
+
+
+def _is_relevant(event):
+    return event["type"] == "ADDED"
+
+
+def test_follow_events(watcher):
+    mock_list = mock.MagicMock()
+
+    def stream(*args, **kwargs):
+        yield {"type": "MODIFIED", "object": None, "raw_object": {}}
+        assert not watcher._relevant_event.is_set()
+        yield {"type": "ADDED", "object": None, "raw_object": {}}
+        watcher.stop()
+
+    mock_watch = mock.MagicMock(resource_version="124")
+    mock_watch.stream.side_effect = stream
+    watcher._follow_events(mock_watch, "nodes", mock_list, {"label_selector": "foo=bar"}, _is_relevant, "123")
+    mock_watch.stream.assert_called_once_with(
+        mock_list,
+        resource_version="123",
+        timeout_seconds=300,
+        label_selector="foo=bar",
+    )
+    mock_list.assert_not_called()
+    assert watcher.wait(10) is True
+
+
+def test_follow_events_expired_cursor(watcher):
+    mock_list = mock.MagicMock()
+    mock_list.return_value.metadata.resource_version = "456"
+    events = [
+        [{"type": "ERROR", "object": None, "raw_object": {"code": 410}}],
+        [{"type": "ADDED", "object": None, "raw_object": {}}],
+    ]
+
+    def stream(*args, **kwargs):
+        yield from events.pop(0)
+        if not events:
+            watcher.stop()
+
+    mock_watch = mock.MagicMock(resource_version="124")
+    mock_watch.stream.side_effect = stream
+    watcher._follow_events(mock_watch, "pods", mock_list, {}, _is_relevant, "123")
+    mock_list.assert_called_once_with(limit=1)
+    assert mock_watch.stream.call_args_list[1][1]["resource_version"] == "456"
+    assert watcher.wait(10) is True
+
+
+def test_follow_only_once(watcher):
+    with mock.patch("clusterman.kubernetes.pool_event_watcher.Thread") as mock_thread:
+        watcher.follow("nodes", mock.MagicMock(), {}, _is_relevant, "123")
+        watcher.follow("nodes", mock.MagicMock(), {}, _is_relevant, "124")
+    assert mock_thread.return_value.start.call_count == 1
+
+
+@mock.patch("clusterman.kubernetes.pool_event_watcher.time")
+def test_wait_rate_limited(mock_time):
+    mock_time.monotonic.side_effect = [0, 0, 2, 2, 4.5, 6]
+    watcher = PoolEventWatcher(min_wakeup_interval=5)
+    watcher._relevant_event.set()
+    assert watcher.wait(1000) is True
+    watcher._relevant_event.set()
+    # the second wakeup is held back until the minimum interval has passed since the first one
+    assert watcher.wait(1000) is True
+    assert mock_time.sleep.call_args_list == [mock.call(1), mock.call(0.5)]
+    assert not watcher._relevant_event.is_set()
+
+
+def test_wait_discarded(watcher):
+    watcher._relevant_event.set()
+    watcher.discard_pending()
+    assert watcher.wait(0.1) is False
+
+
+def test_wait_stop_requested(watcher):
+    stop_event = Event()
+    stop_event.set()
+    assert watcher.wait(10, stop_event) is False
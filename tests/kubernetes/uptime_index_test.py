@@ -0,0 +1,89 @@
+# Copyright 2019 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime
+from datetime import timezone
+from unittest import mock
+
+import pytest
+from kubernetes.client import V1ObjectMeta
+from kubernetes.client.models.v1_node import V1Node as KubernetesNode
+
+from clusterman.kubernetes.uptime_index import UptimeIndex
+
+
+def _node(name, created_at):
+    return KubernetesNode(
+        metadata=V1ObjectMeta(name=name, creation_timestamp=datetime.fromtimestamp(created_at, tz=timezone.utc))
+    )
+
+
+@pytest.fixture
+def uptime_index():
+    mock_core_api = mock.MagicMock()
+    mock_core_api.list_node.return_value = mock.MagicMock(
+        items=[_node("node-1", 100), _node("node-2", 300), _node("node-3", 200)],
+        metadata=mock.MagicMock(resource_version="123"),
+    )
+    index = UptimeIndex(mock_core_api, {"label_selector": "clusterman.com/pool=bar"})
+    index._relist()
+    return index
+
+
+def test_nodes_older_than(uptime_index):
+    uptime_index._core_api.list_node.assert_called_once_with(label_selector="clusterman.com/pool=bar")
+    assert uptime_index.nodes_older_than(50) == []
+    assert uptime_index.nodes_older_than(250) == ["node-1", "node-3"]
+    assert uptime_index.nodes_older_than(1000) == ["node-1", "node-3", "node-2"]
+
+
+def test_apply_event(uptime_index):
+    uptime_index._apply_event({"type": "ADDED", "object": _node("node-4", 50)})
+    uptime_index._apply_event({"type": "DELETED", "object": _node("node-1", 100)})
+    uptime_index._apply_event({"type": "MODIFIED", "object": _node("node-3", 400)})
+    assert uptime_index.nodes_older_than(1000) == ["node-4", "node-2", "node-3"]
+
+
+def test_follow_node_events(uptime_index):
+    def stream(*args, **kwargs):
+        yield {"type": "ADDED", "object": _node("node-4", 50), "raw_object": {}}
+        uptime_index.stop()
+
+    with mock.patch("clusterman.kubernetes.uptime_index.kubernetes") as mock_kube:
+        mock_kube.watch.Watch.return_value.stream.side_effect = stream
+        uptime_index._follow_node_events()
+    mock_kube.watch.Watch.return_value.stream.assert_called_once_with(
+        uptime_index._core_api.list_node,
+        resource_version="123",
+        timeout_seconds=300,
+        label_selector="clusterman.com/pool=bar",
+    )
+    assert uptime_index.nodes_older_than(60) == ["node-4"]
+
+
+def test_follow_node_events_expired_cursor(uptime_index):
+    events = [
+        [{"type": "ERROR", "object": None, "raw_object": {"code": 410}}],
+        [{"type": "ADDED", "object": _node("node-4", 50), "raw_object": {}}],
+    ]
+
+    def stream(*args, **kwargs):
+        yield from events.pop(0)
+        if not events:
+            uptime_index.stop()
+
+    with mock.patch("clusterman.kubernetes.uptime_index.kubernetes") as mock_kube:
+        mock_kube.watch.Watch.return_value.stream.side_effect = stream
+        uptime_index._follow_node_events()
+    assert uptime_index._core_api.list_node.call_count == 2
+    assert uptime_index.nodes_older_than(60) == ["node-4"]
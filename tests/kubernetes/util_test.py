@@ -44,6 +44,13 @@ def test_cached_corev1_api_caches_cached_function(mock_cached_core_v1_api):
     assert mock_cached_core_v1_api._client.list_node.call_count == 1
 
 
+def test_cached_corev1_api_skips_cache_for_watch(mock_cached_core_v1_api):
+    with mock.patch.dict(os.environ, {"KUBE_CACHE_ENABLED": "true"}):
+        mock_cached_core_v1_api.list_node(watch=True)
+        mock_cached_core_v1_api.list_node(watch=True)
+    assert mock_cached_core_v1_api._client.list_node.call_count == 2
+
+
 def test_resource_parser_cpu():
     assert ResourceParser.cpus({"cpu": "2"}) == 2.0
     assert ResourceParser.cpus({"cpu": "500m"}) == 0.5
@@ -20,6 +20,9 @@ from clusterman.migration.event import MigrationCondition
 from clusterman.migration.event import MigrationEvent
 
 
+MOCK_EVENT_KERNEL_VERSION = semver.VersionInfo.parse("1.2.3")
+
+
 @pytest.fixture
 def mock_migration_event():
     yield MigrationEvent(
@@ -27,5 +30,5 @@ def mock_migration_event():
         cluster="mesos-test",
         pool="bar",
         label_selectors=[],
-        condition=MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, semver.VersionInfo.parse("1.2.3")),
+        condition=MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, MOCK_EVENT_KERNEL_VERSION),
     )
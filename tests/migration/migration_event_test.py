@@ -27,6 +27,12 @@ from clusterman.migration.event import ConditionTrait
 from clusterman.migration.event import MigrationCondition
 from clusterman.migration.event import MigrationEvent
 
+KERNEL_VERSION = semver.VersionInfo.parse("1.2.3")
+KERNEL_VERSION_AWS = semver.VersionInfo.parse("1.2.3-4567-aws")
+KERNEL_VERSION_NEWER = semver.VersionInfo.parse("3.4.5")
+LSB_VERSION = packaging.version.parse("22.04")
+LSB_VERSION_OLD = packaging.version.parse("1.2")
+
 
 @pytest.mark.parametrize(
     "trait,operator,target,expected",
@@ -35,13 +41,13 @@ from clusterman.migration.event import MigrationEvent
             "kernel",
             "ge",
             "1.2.3-4567-aws",
-            MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, semver.VersionInfo.parse("1.2.3-4567-aws")),
+            MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, KERNEL_VERSION_AWS),
         ),
         (
             "lsbrelease",
             "ge",
             "22.04",
-            MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, packaging.version.parse("22.04")),
+            MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, LSB_VERSION),
         ),
         (
             "instance_type",
@@ -77,11 +83,11 @@ def test_condition_from_dict_error(trait: str, operator: str, target: str, error
     "condition,expected",
     (
         (
-            MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, packaging.version.parse("1.2")),
+            MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, LSB_VERSION_OLD),
             {"trait": "lsbrelease", "operator": "ge", "target": "1.2"},
         ),
         (
-            MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, semver.VersionInfo.parse("1.2.3")),
+            MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, KERNEL_VERSION),
             {"trait": "kernel", "operator": "ge", "target": "1.2.3"},
         ),
         (
@@ -107,7 +113,7 @@ def test_event_to_string():
         condition=MigrationCondition(
             ConditionTrait.KERNEL,
             ConditionOperator.IN,
-            [semver.VersionInfo.parse("1.2.3"), semver.VersionInfo.parse("3.4.5")],
+            [KERNEL_VERSION, KERNEL_VERSION_NEWER],
         ),
     )
     assert (
@@ -131,8 +137,8 @@ def test_event_to_crd_body(mock_migration_event):
 @pytest.mark.parametrize(
     "condition,result",
     (
-        (MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, semver.VersionInfo.parse("1.2.3")), True),
-        (MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, packaging.version.parse("22.04")), False),
+        (MigrationCondition(ConditionTrait.KERNEL, ConditionOperator.GE, KERNEL_VERSION), True),
+        (MigrationCondition(ConditionTrait.LSBRELEASE, ConditionOperator.GE, LSB_VERSION), False),
         (MigrationCondition(ConditionTrait.UPTIME, ConditionOperator.LT, 1337), False),
         (MigrationCondition(ConditionTrait.INSTANCE_TYPE, ConditionOperator.IN, ["m5.4xlarge", "r5.2xlarge"]), True),
     ),
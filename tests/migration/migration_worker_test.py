@@ -15,13 +15,17 @@ import time
 from datetime import timedelta
 from itertools import chain
 from itertools import repeat
+from multiprocessing import Event
 from unittest.mock import ANY
 from unittest.mock import call
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 
+from clusterman.autoscaler.pool_manager import PoolManager
+from clusterman.aws.markets import InstanceMarket
 from clusterman.draining.queue import TerminationReason
 from clusterman.interfaces.types import AgentMetadata
 from clusterman.interfaces.types import ClusterNodeMetadata
@@ -30,12 +34,34 @@ from clusterman.migration.settings import MigrationPrecendence
 from clusterman.migration.settings import PoolPortion
 from clusterman.migration.settings import WorkerSetup
 from clusterman.migration.worker import _drain_node_selection
+from clusterman.migration.worker import _get_monitoring_handles
 from clusterman.migration.worker import _monitor_pool_health
 from clusterman.migration.worker import event_migration_worker
+from clusterman.migration.worker import NodeMigrationError
 from clusterman.migration.worker import RestartableDaemonProcess
 from clusterman.migration.worker import uptime_migration_worker
 
 
+EMPTY_AGENT = AgentMetadata(agent_id="")
+DRAIN_SELECTION_NODES = tuple(
+    ClusterNodeMetadata(
+        AgentMetadata(agent_id=str(i), task_count=30 - 2 * i),
+        InstanceMetadata(InstanceMarket("m5.large", "us-west-2a"), 1.0, uptime=timedelta(days=i)),
+    )
+    for i in range(6)
+)
+
+
+def _mock_pool_manager():
+    """Pool manager mock limited to the PoolManager interface, plus the attributes it sets up on init"""
+    return MagicMock(spec=PoolManager, cluster="mesos-test", pool="bar", cluster_connector=MagicMock())
+
+
+@pytest.fixture(autouse=True)
+def clear_monitoring_handles():
+    _get_monitoring_handles.cache_clear()
+
+
 @pytest.fixture
 def event_worker_setup():
     yield WorkerSetup(
@@ -52,7 +78,7 @@ def event_worker_setup():
 
 @patch("clusterman.migration.worker.time")
 def test_monitor_pool_health(mock_time):
-    mock_manager = MagicMock()
+    mock_manager = _mock_pool_manager()
     mock_connector = mock_manager.cluster_connector
     drained = [
         ClusterNodeMetadata(
@@ -62,16 +88,62 @@ def test_monitor_pool_health(mock_time):
     ]
     mock_manager.is_capacity_satisfied.side_effect = [False, True, True]
     mock_connector.has_enough_capacity_for_pods.side_effect = [False, False, True]
-    mock_connector.get_agent_metadata.side_effect = chain(
-        (AgentMetadata(agent_id=i) for i in range(3)),
-        repeat(AgentMetadata(agent_id="")),
-    )
+    # the nodes are checked on the first two iterations only, after that they are all gone
+    mock_connector.get_agent_metadata_bulk.side_effect = [
+        {node.instance.ip_address: AgentMetadata(agent_id=i if i < 3 else "") for i, node in enumerate(drained)},
+        {node.instance.ip_address: EMPTY_AGENT for node in drained},
+    ]
     mock_time.time.return_value = 0
     assert _monitor_pool_health(mock_manager, 1, drained, 120) is True
     # 1st iteration still draining some nodes
     # 2nd iteration underprovisioned capacity
     # 3rd iteration left over unscheduable pods
-    assert mock_time.sleep.call_count == 3
+    assert mock_connector.wait_for_pool_events.call_count == 3
+    # conditions already met are not re-evaluated
+    assert mock_connector.get_agent_metadata_bulk.call_count == 2
+    assert mock_manager.is_capacity_satisfied.call_count == 2
+    mock_connector.wait_for_pool_events.assert_called_with(timeout_seconds=1, watch_pods=True, stop_event=None)
+    assert mock_time.sleep.call_count == 0
+
+
+@patch("clusterman.migration.worker.time")
+def test_monitor_pool_health_backoff(mock_time):
+    mock_manager = _mock_pool_manager()
+    mock_connector = mock_manager.cluster_connector
+    drained = [ClusterNodeMetadata(AgentMetadata(agent_id="a"), InstanceMetadata(None, None, ip_address="1.1.1.1"))]
+    mock_connector.get_agent_metadata_bulk.return_value = {"1.1.1.1": AgentMetadata(agent_id="a")}
+    mock_time.time.side_effect = chain(repeat(0, 10), repeat(5000))
+    assert _monitor_pool_health(mock_manager, 5000, drained, 60) is False
+    assert [c[1]["timeout_seconds"] for c in mock_connector.wait_for_pool_events.call_args_list] == [
+        60,
+        120,
+        240,
+        480,
+        480,
+    ]
+
+
+@patch("clusterman.migration.worker.time")
+def test_monitor_pool_health_backoff_capped_by_deadline(mock_time):
+    mock_manager = _mock_pool_manager()
+    mock_connector = mock_manager.cluster_connector
+    drained = [ClusterNodeMetadata(AgentMetadata(agent_id="a"), InstanceMetadata(None, None, ip_address="1.1.1.1"))]
+    mock_connector.get_agent_metadata_bulk.return_value = {"1.1.1.1": AgentMetadata(agent_id="a")}
+    mock_time.time.side_effect = chain(repeat(0, 6), repeat(995, 2), repeat(1000))
+    assert _monitor_pool_health(mock_manager, 1000, drained, 60) is False
+    assert [c[1]["timeout_seconds"] for c in mock_connector.wait_for_pool_events.call_args_list] == [60, 120, 240, 5]
+
+
+@patch("clusterman.migration.worker.time")
+def test_monitor_pool_health_deadline_during_reload(mock_time):
+    mock_manager = _mock_pool_manager()
+    mock_connector = mock_manager.cluster_connector
+    drained = [ClusterNodeMetadata(AgentMetadata(agent_id="a"), InstanceMetadata(None, None, ip_address="1.1.1.1"))]
+    mock_connector.get_agent_metadata_bulk.return_value = {"1.1.1.1": AgentMetadata(agent_id="a")}
+    # the deadline passes while the pool state is being reloaded
+    mock_time.time.side_effect = [0, 11]
+    assert _monitor_pool_health(mock_manager, 10, drained, 60) is False
+    mock_connector.wait_for_pool_events.assert_not_called()
 
 
 @patch("clusterman.migration.worker.time")
@@ -82,15 +154,9 @@ def test_drain_node_selection(mock_sfx, mock_monitor, mock_time):
     mock_drain_count_sfx = mock_sfx.create_counter.return_value
     mock_uptime_stats_sfx = mock_sfx.create_gauge.return_value
     mock_job_duration_sfx = mock_sfx.create_timer.return_value
-    mock_manager = MagicMock()
+    mock_manager = _mock_pool_manager()
     mock_monitor.return_value = True
-    mock_manager.get_node_metadatas.return_value = [
-        ClusterNodeMetadata(
-            AgentMetadata(agent_id=i, task_count=30 - 2 * i),
-            InstanceMetadata(None, None, uptime=timedelta(days=i)),
-        )
-        for i in range(6)
-    ]
+    mock_manager.get_node_metadatas.return_value = list(DRAIN_SELECTION_NODES)
     mock_time.time.side_effect = range(5)
     worker_setup = WorkerSetup(
         rate=PoolPortion(2),
@@ -102,55 +168,42 @@ def test_drain_node_selection(mock_sfx, mock_monitor, mock_time):
         expected_duration=3,
         health_check_interval=4,
     )
-    assert _drain_node_selection(mock_manager, lambda n: n.agent.agent_id > 2, worker_setup) is True
-    mock_manager.get_node_metadatas.assert_called_once_with(("running",))
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=False))
+    assert (
+        _drain_node_selection(mock_manager, lambda n: n.agent.agent_id > "2", worker_setup, stop_event=mock_stop_event)
+        is True
+    )
+    mock_stop_event.wait.assert_has_calls([call(1), call(1)])
+    # node list gets refreshed between chunks, to skip nodes which went away in the meantime
+    mock_manager.get_node_metadatas.assert_has_calls([call(("running",)), call(("running",))])
     mock_manager.submit_for_draining.assert_has_calls(
-        [
-            call(
-                ClusterNodeMetadata(
-                    AgentMetadata(agent_id=i, task_count=30 - 2 * i),
-                    InstanceMetadata(None, None, uptime=timedelta(days=i)),
-                ),
-                TerminationReason.NODE_MIGRATION,
-            )
-            for i in range(5, 2, -1)
-        ]
+        [call(node, TerminationReason.NODE_MIGRATION) for node in DRAIN_SELECTION_NODES[5:2:-1]],
+        any_order=True,
     )
+    assert mock_manager.flush_draining_submissions.call_count == 2
     mock_monitor.assert_has_calls(
         [
             call(
                 manager=mock_manager,
                 timeout=2,
-                drained=[
-                    ClusterNodeMetadata(
-                        AgentMetadata(agent_id=5, task_count=20),
-                        InstanceMetadata(None, None, uptime=timedelta(days=5)),
-                    ),
-                    ClusterNodeMetadata(
-                        AgentMetadata(agent_id=4, task_count=22),
-                        InstanceMetadata(None, None, uptime=timedelta(days=4)),
-                    ),
-                ],
+                drained=list(DRAIN_SELECTION_NODES[5:3:-1]),
                 health_check_interval_seconds=4,
                 ignore_pod_health=False,
+                stop_event=mock_stop_event,
             ),
             call(
                 manager=mock_manager,
                 timeout=3,
-                drained=[
-                    ClusterNodeMetadata(
-                        AgentMetadata(agent_id=3, task_count=24),
-                        InstanceMetadata(None, None, uptime=timedelta(days=3)),
-                    ),
-                ],
+                drained=list(DRAIN_SELECTION_NODES[3:2:-1]),
                 health_check_interval_seconds=4,
                 ignore_pod_health=False,
+                stop_event=mock_stop_event,
             ),
         ]
     )
     mock_job_duration_sfx.start.assert_called_once_with()
     mock_job_duration_sfx.stop.assert_called_once_with()
-    assert mock_drain_count_sfx.count.call_count == 3
+    mock_drain_count_sfx.count.assert_has_calls([call(2), call(1)])
     mock_uptime_stats_sfx.set.assert_has_calls(
         [
             call(432000.0),
@@ -160,6 +213,148 @@ def test_drain_node_selection(mock_sfx, mock_monitor, mock_time):
     )
 
 
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker._monitor_pool_health")
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_drain_node_selection_stop_requested(mock_sfx, mock_monitor, mock_time, event_worker_setup):
+    mock_manager = _mock_pool_manager()
+    mock_manager.get_node_metadatas.return_value = [
+        ClusterNodeMetadata(AgentMetadata(agent_id=i), InstanceMetadata(None, None, uptime=timedelta(days=i)))
+        for i in range(4)
+    ]
+    mock_time.time.return_value = 0
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=True))
+    assert _drain_node_selection(mock_manager, lambda _: True, event_worker_setup, stop_event=mock_stop_event) is False
+    assert mock_manager.submit_for_draining.call_count == 2
+    mock_monitor.assert_not_called()
+    mock_sfx.return_value.create_timer.return_value.stop.assert_called_once_with()
+
+
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker._monitor_pool_health")
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_drain_node_selection_submission_failure(mock_sfx, mock_monitor, mock_time, event_worker_setup):
+    mock_manager = _mock_pool_manager()
+    mock_manager.get_node_metadatas.return_value = [
+        ClusterNodeMetadata(AgentMetadata(agent_id=str(i)), InstanceMetadata(None, None, uptime=timedelta(days=i)))
+        for i in range(4)
+    ]
+    mock_manager.submit_for_draining.side_effect = [None, ValueError]
+    mock_time.time.return_value = 0
+    with pytest.raises(ValueError):
+        _drain_node_selection(mock_manager, lambda _: True, event_worker_setup, stop_event=MagicMock())
+    # submissions which went through are still sent out
+    mock_manager.flush_draining_submissions.assert_called_once_with()
+    mock_monitor.assert_not_called()
+
+
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker._monitor_pool_health")
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_drain_node_selection_skip_gone_nodes(mock_sfx, mock_monitor, mock_time, event_worker_setup):
+    mock_manager = _mock_pool_manager()
+    nodes = [
+        ClusterNodeMetadata(
+            AgentMetadata(agent_id=i, task_count=i),
+            InstanceMetadata(None, None, instance_id=f"i-{i}", uptime=timedelta(days=i)),
+        )
+        for i in range(5)
+    ]
+    mock_manager.get_node_metadatas.side_effect = [nodes, nodes[:2] + nodes[3:], nodes[:2] + nodes[3:]]
+    mock_time.time.return_value = 0
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=False))
+    assert _drain_node_selection(mock_manager, lambda _: True, event_worker_setup, stop_event=mock_stop_event) is True
+    assert sorted(c[0][0].agent.agent_id for c in mock_manager.submit_for_draining.call_args_list) == [0, 1, 3, 4]
+
+
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker._monitor_pool_health")
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_drain_node_selection_deadline(mock_sfx, mock_monitor, mock_time, event_worker_setup):
+    mock_manager = _mock_pool_manager()
+    mock_manager.get_node_metadatas.return_value = [
+        ClusterNodeMetadata(AgentMetadata(agent_id=i), InstanceMetadata(None, None, uptime=timedelta(days=i)))
+        for i in range(4)
+    ]
+    mock_time.time.side_effect = [0, 0, 11]
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=False))
+    assert (
+        _drain_node_selection(
+            mock_manager, lambda _: True, event_worker_setup, stop_event=mock_stop_event, deadline=1.5
+        )
+        is False
+    )
+    assert mock_manager.submit_for_draining.call_count == 2
+    mock_stop_event.wait.assert_called_once_with(1)
+    assert mock_monitor.call_args[1]["timeout"] == 1.5
+    mock_sfx.return_value.create_timer.return_value.stop.assert_called_once_with()
+
+
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker._monitor_pool_health")
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_drain_node_selection_deadline_during_bootstrap_wait(mock_sfx, mock_monitor, mock_time, event_worker_setup):
+    mock_manager = _mock_pool_manager()
+    mock_manager.get_node_metadatas.return_value = [
+        ClusterNodeMetadata(AgentMetadata(agent_id=str(i)), InstanceMetadata(None, None, uptime=timedelta(days=i)))
+        for i in range(4)
+    ]
+    mock_time.time.return_value = 0
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=False))
+    assert (
+        _drain_node_selection(
+            mock_manager, lambda _: True, event_worker_setup, stop_event=mock_stop_event, deadline=0.5
+        )
+        is False
+    )
+    # the bootstrap wait doesn't go past the deadline
+    mock_stop_event.wait.assert_called_once_with(0.5)
+    mock_monitor.assert_not_called()
+    mock_sfx.return_value.create_timer.return_value.stop.assert_called_once_with()
+
+
+@patch("clusterman.migration.worker.get_monitoring_client")
+def test_get_monitoring_handles(mock_sfx):
+    handles = _get_monitoring_handles("mesos-test", "bar")
+    assert _get_monitoring_handles("mesos-test", "bar") is handles
+    mock_sfx.return_value.create_counter.assert_called_once_with(
+        "clusterman.node_migration.drain_count", {"cluster": "mesos-test", "pool": "bar"}
+    )
+
+
+@patch("clusterman.migration.worker.PoolManager")
+@patch("clusterman.migration.worker._drain_node_selection")
+def test_uptime_migration_worker_stop_requested(mock_drain_selection, mock_manager_class):
+    mock_stop_event = MagicMock(wait=MagicMock(return_value=True))
+    mock_manager_class.return_value.is_capacity_satisfied.return_value = False
+    mock_uptime_index = mock_manager_class.return_value.cluster_connector.build_node_uptime_index.return_value
+    uptime_migration_worker("mesos-test", "bar", 10000, MagicMock(), pool_lock=MagicMock(), stop_event=mock_stop_event)
+    mock_stop_event.wait.assert_called_once_with(3600)
+    mock_drain_selection.assert_not_called()
+    mock_uptime_index.stop.assert_called_once_with()
+
+
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker.PoolManager")
+@patch("clusterman.migration.worker._drain_node_selection")
+def test_uptime_migration_worker_stop_while_waiting_for_lock(
+    mock_drain_selection, mock_manager_class, mock_time, event_worker_setup
+):
+    mock_manager = mock_manager_class.return_value
+    mock_manager.is_capacity_satisfied.return_value = True
+    mock_manager.cluster_connector.build_node_uptime_index.return_value.nodes_older_than.return_value = ["a"]
+    mock_time.time.return_value = 20000
+    mock_pool_lock = MagicMock(acquire=MagicMock(return_value=False))
+    mock_stop_event = MagicMock(is_set=MagicMock(return_value=True), wait=MagicMock(return_value=True))
+    uptime_migration_worker(
+        "mesos-test", "bar", 10000, event_worker_setup, pool_lock=mock_pool_lock, stop_event=mock_stop_event
+    )
+    # waiting for the pool lock is given up on as soon as stop is requested
+    mock_pool_lock.acquire.assert_called_once_with(block=False)
+    mock_drain_selection.assert_not_called()
+    mock_pool_lock.release.assert_not_called()
+
+
 @patch("clusterman.migration.worker.time")
 @patch("clusterman.migration.worker.PoolManager")
 @patch("clusterman.migration.worker._drain_node_selection")
@@ -167,12 +362,31 @@ def test_uptime_migration_worker(mock_drain_selection, mock_manager_class, mock_
     mock_setup = MagicMock()
     mock_manager = mock_manager_class.return_value
     mock_manager.is_capacity_satisfied.side_effect = [True, False, True]
-    with pytest.raises(StopIteration):  # using end of mock side-effect to get out of forever looop
-        uptime_migration_worker("mesos-test", "bar", 10000, mock_setup, pool_lock=MagicMock())
+    mock_uptime_index = mock_manager.cluster_connector.build_node_uptime_index.return_value
+    mock_uptime_index.nodes_older_than.side_effect = [["a", "b"], [], ["a"], ["b"]]
+    mock_time.time.return_value = 20000
+    mock_pool_lock = MagicMock()
+    # stop is requested at the end of the 4th iteration, once the uptime index responses run out
+    uptime_migration_worker(
+        "mesos-test",
+        "bar",
+        10000,
+        mock_setup,
+        pool_lock=mock_pool_lock,
+        stop_event=MagicMock(wait=MagicMock(side_effect=[False, False, False, True])),
+    )
+    assert mock_pool_lock.release.call_count == 2
+    mock_uptime_index.nodes_older_than.assert_called_with(10000)
+    # pool state is only fetched when some node is over the uptime threshold, right before being used
+    assert [c for c in mock_manager.method_calls if c[0] in ("reload_state", "is_capacity_satisfied")] == [
+        call.reload_state(load_pods_info=False),
+        call.is_capacity_satisfied(),
+    ] * 3
     assert mock_drain_selection.call_count == 2
     selector = mock_drain_selection.call_args_list[0][0][1]
-    assert selector(ClusterNodeMetadata(None, InstanceMetadata(None, None, uptime=timedelta(seconds=10001)))) is True
-    assert selector(ClusterNodeMetadata(None, InstanceMetadata(None, None, uptime=timedelta(seconds=9999)))) is False
+    assert selector(ClusterNodeMetadata(AgentMetadata(agent_id="a"), InstanceMetadata(None, None))) is True
+    assert selector(ClusterNodeMetadata(AgentMetadata(agent_id="c"), InstanceMetadata(None, None))) is False
+    mock_uptime_index.stop.assert_called_once_with()
 
 
 @patch("clusterman.migration.worker.time")
@@ -181,7 +395,6 @@ def test_uptime_migration_worker(mock_drain_selection, mock_manager_class, mock_
 @patch("clusterman.migration.worker.disable_autoscaling")
 @patch("clusterman.migration.worker._drain_node_selection")
 @patch("clusterman.migration.worker._monitor_pool_health", lambda *_, **__: True)
-@patch("clusterman.migration.worker.limit_function_runtime", lambda f, _: f())
 def test_event_migration_worker(
     mock_drain_selection,
     mock_disable_scaling,
@@ -199,12 +412,13 @@ def test_event_migration_worker(
         )
         for i in range(1, 6)
     ]
+    mock_manager.get_node_weights_ndarray.return_value = np.full(5, 4.0)
     mock_manager.target_capacity = 19
     event_migration_worker(mock_migration_event, event_worker_setup, pool_lock=MagicMock())
     mock_manager.modify_target_capacity.assert_called_once_with(23)
     mock_disable_scaling.assert_called_once_with("mesos-test", "bar", "kubernetes", 3)
     mock_enable_scaling.assert_called_once_with("mesos-test", "bar", "kubernetes")
-    mock_drain_selection.assert_called_once_with(mock_manager, ANY, event_worker_setup)
+    mock_drain_selection.assert_called_once_with(mock_manager, ANY, event_worker_setup, stop_event=None, deadline=3)
     selector = mock_drain_selection.call_args_list[0][0][1]
     assert list(filter(selector, mock_manager.get_node_metadatas.return_value)) == [
         ClusterNodeMetadata(
@@ -230,7 +444,7 @@ def test_event_migration_worker_error(
 ):
     mock_time.time.return_value = 0
     mock_manager = mock_manager_class.return_value
-    mock_manager.get_node_metadatas.side_effect = Exception(123)
+    mock_manager.get_node_weights_ndarray.side_effect = Exception(123)
     with pytest.raises(Exception):
         event_migration_worker(mock_migration_event, event_worker_setup, pool_lock=MagicMock())
     mock_disable_scaling.assert_called_once_with("mesos-test", "bar", "kubernetes", 3)
@@ -238,14 +452,67 @@ def test_event_migration_worker_error(
     mock_manager.modify_target_capacity.assert_not_called()
 
 
+@patch("clusterman.migration.worker.time")
+@patch("clusterman.migration.worker.PoolManager")
+@patch("clusterman.migration.worker.enable_autoscaling")
+@patch("clusterman.migration.worker.disable_autoscaling")
+def test_event_migration_worker_lock_not_acquired(
+    mock_disable_scaling,
+    mock_enable_scaling,
+    mock_manager_class,
+    mock_time,
+    mock_migration_event,
+    event_worker_setup,
+):
+    mock_time.time.side_effect = [0, 1, 4]
+    mock_lock = MagicMock(acquire=MagicMock(return_value=False))
+    with pytest.raises(NodeMigrationError):
+        event_migration_worker(mock_migration_event, event_worker_setup, pool_lock=mock_lock)
+    mock_lock.acquire.assert_has_calls([call(block=False), call(timeout=5)])
+    mock_lock.release.assert_not_called()
+    mock_manager_class.return_value.reload_state.assert_not_called()
+    mock_disable_scaling.assert_not_called()
+
+
+def _signal_started_and_sleep(started):
+    started.set()
+    time.sleep(10)
+
+
+def _signal_started_and_wait(started, stop_event):
+    started.set()
+    stop_event.wait(10)
+
+
 def test_restartable_daemon_process():
-    proc = RestartableDaemonProcess(lambda: time.sleep(10), tuple(), {})
+    started = Event()
+    proc = RestartableDaemonProcess(_signal_started_and_sleep, (started,), {})
     proc.start()
-    time.sleep(0.05)
+    assert started.wait(timeout=1)
+    started.clear()
     assert proc.is_alive()
     old_handle = proc.process_handle
     proc.restart()
-    time.sleep(0.05)
+    assert started.wait(timeout=1)
     assert proc.is_alive()
     assert proc.process_handle is not old_handle
+    assert proc.process_handle._start_method == "fork"
+    assert proc.pid == proc.process_handle.pid
+    proc.kill()
+    proc.join()
+    assert proc.exitcode is not None
+
+
+def test_restartable_daemon_process_graceful_restart():
+    started, stop_event = Event(), Event()
+    proc = RestartableDaemonProcess(_signal_started_and_wait, (started, stop_event), {}, stop_event=stop_event)
+    proc.start()
+    assert started.wait(timeout=1)
+    started.clear()
+    old_handle = proc.process_handle
+    proc.restart()
+    assert old_handle.exitcode == 0  # returned on its own rather than being killed
+    assert started.wait(timeout=1)
+    assert proc.is_alive()
+    assert not stop_event.is_set()
     proc.kill()
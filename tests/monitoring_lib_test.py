@@ -24,3 +24,10 @@ from clusterman.monitoring_lib import SignalFXMonitoringClient
 def test_default_monitoring_client(ym):
     with mock.patch("clusterman.monitoring_lib.yelp_meteorite", ym):
         assert get_monitoring_client() == (LogMonitoringClient if not ym else SignalFXMonitoringClient)
+
+
+def test_log_counter_count_many():
+    counter = LogMonitoringClient.create_counter("foo")
+    counter.count()
+    counter.count(3)
+    assert counter.counter == 4